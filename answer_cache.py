@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+import hashlib
+import json
+import math
+import os
+import pickle
+import re
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import NodeWithScore
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+
+def _cosine_similarity(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    source_nodes: list[NodeWithScore]
+    embedding: list[float] | None = None
+
+
+class AnswerCache:
+    """Answers to golden questions for one pipeline version and retriever config.
+
+    Each version, retriever config and pipeline id gets its own file, so changing
+    any of them starts from an empty cache. The pipeline id is whatever the caller
+    uses to identify the answer pipeline's code and prompts, e.g. a git commit. Lookups match the normalized question exactly and, when an
+    embedding model is given, fall back to the most similar cached question.
+    """
+    def __init__(
+        self,
+        version: int,
+        retriever_config: dict[str, Any],
+        pipeline_id: str = "",
+        cache_dir: str = "answer_cache",
+        embed_model: BaseEmbedding | None = None,
+        similarity_threshold: float = 0.95,
+    ):
+        self.fingerprint: str = hashlib.sha256(
+            json.dumps({
+                'version': version,
+                'retriever_config': retriever_config,
+                'pipeline_id': pipeline_id
+            }, sort_keys=True, default=str).encode()
+        ).hexdigest()[:16]
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_path: str = os.path.join(cache_dir, f'answers_{self.fingerprint}.pkl')
+        self.embed_model: BaseEmbedding | None = embed_model
+        self.similarity_threshold: float = similarity_threshold
+        self.entries: dict[str, CachedAnswer] = self._load()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def _load(self) -> dict[str, CachedAnswer]:
+        if not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self):
+        with open(self.cache_path, 'wb') as f:
+            pickle.dump(self.entries, f)
+
+    async def _embed(self, question: str) -> list[float] | None:
+        if self.embed_model is None:
+            return None
+        return await self.embed_model.aget_text_embedding(normalize_question(question))
+
+    async def get(self, question: str) -> CachedAnswer | None:
+        entry = self.entries.get(normalize_question(question))
+        if entry is None and self.embed_model is not None and self.entries:
+            embedding = await self._embed(question)
+            scored = [(_cosine_similarity(embedding, e.embedding), e) for e in self.entries.values() if e.embedding is not None]
+            if scored:
+                similarity, best = max(scored, key=lambda x: x[0])
+                if similarity >= self.similarity_threshold:
+                    entry = best
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(self, question: str, answer: str, source_nodes: list[NodeWithScore]):
+        self.entries[normalize_question(question)] = CachedAnswer(
+            question=question,
+            answer=answer,
+            source_nodes=list(source_nodes),
+            embedding=await self._embed(question)
+        )
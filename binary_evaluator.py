@@ -1,21 +1,47 @@
 from abc import abstractmethod
 import asyncio
 from typing import Any
-from collections.abc import Coroutine
+from collections.abc import Callable, Coroutine
 from llama_index.core.base.response.schema import Response
 from openai import AsyncOpenAI
 
-from evaluation_result import EvaluationResult
+from evaluation.evaluation_plan import PlannedCall
+from evaluation.evaluation_result import EvaluationResult, UsageStats
+from evaluation.evaluation_templates import EvaluationData
+from evaluation.judge_backend import JudgeBackend, OpenAIChatBackend
+from evaluation.tracing import trace_tags, tracer
+
+# Room for a structured verdict with a short feedback; a verdict cut off at the
+# limit is retried once with the larger one rather than recorded as an error
+STRUCTURED_MAX_TOKENS = 300
+STRUCTURED_RETRY_MAX_TOKENS = 1000
 
 class BinaryEvaluator():
-    def __init__(self) -> None:
+    def __init__(self, model: str = "gpt-4o", terse: bool = False, explain_failures: bool = False,
+                 backend: JudgeBackend | None = None) -> None:
         self.llm: AsyncOpenAI = AsyncOpenAI()
+        self.backend: JudgeBackend = backend or OpenAIChatBackend(self.llm)
+        self.model: str = model
+        # Terse mode asks for a structured verdict instead of a long analysis;
+        # explain_failures re-judges failing items with the verbose template
+        self.terse: bool = terse
+        self.explain_failures: bool = explain_failures
+        self.usage: UsageStats = UsageStats()
         self._completed_count = 0
         self._total_count = 0
         
+    def start_run(self) -> None:
+        """Called by the pipeline before each run, to drop state kept for the previous one."""
+        pass
+
     @abstractmethod
     async def _evaluate(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> EvaluationResult:
         pass
+
+    def _plan(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> list[PlannedCall]:
+        # Evaluators that don't render their prompts are estimated as one verbose call over all their inputs
+        prompt = "\n".join([question or "", answer or "", response_text or ""] + (contexts or []))
+        return [PlannedCall(kind="unplanned", model=self.model, prompt=prompt, expected_output_tokens=400, upper_bound=True)]
     
     def _extract_result(self, response: str) -> bool:
         if "Result:" in response:
@@ -27,6 +53,32 @@ class BinaryEvaluator():
         else:
             return False
         
+    def _render_messages(self, system_prompt: str, user_prompt: str) -> list[dict[str, str]]:
+        # The system message is the shared prefix and must not contain per-item text
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    async def _complete(self, messages: list[dict[str, str]], temperature: float = 0.0) -> str:
+        with tracer.span('judge_call', model=self.model):
+            completion = await self.backend.complete(self.model, messages, temperature=temperature)
+        self.usage.record(completion)
+        return completion.content
+
+    async def _judge_structured(self, messages: list[dict[str, str]], temperature: float = 0.0) -> EvaluationData:
+        with tracer.span('judge_call', model=self.model):
+            completion = await self.backend.complete(self.model, messages, temperature=temperature, max_tokens=STRUCTURED_MAX_TOKENS,
+                                                     response_format=EvaluationData)
+        self.usage.record(completion)
+        if completion.truncated:
+            with tracer.span('judge_call', model=self.model, retry="truncated"):
+                completion = await self.backend.complete(self.model, messages, temperature=temperature, max_tokens=STRUCTURED_RETRY_MAX_TOKENS,
+                                                         response_format=EvaluationData)
+            self.usage.record(completion)
+        with tracer.span('parse'):
+            return EvaluationData.model_validate_json(completion.content)
+
     def _extract_feedback(self, response: str) -> str:
         if "Feedback:" in response:
             r = response.split("Feedback:")[1].strip()
@@ -37,15 +89,35 @@ class BinaryEvaluator():
         else:
             return ""
         
+    def _error_result(self, question: str, error: Exception) -> EvaluationResult:
+        return EvaluationResult(
+            query=question,
+            contexts=None,
+            response_text="ERROR",
+            passing=False,
+            feedback=str(error)
+        )
+
     async def evaluate_responses(self, questions: list[str], answers: list[str], 
-                               responses: list[Response]) -> list[dict[str, int | EvaluationResult]]:
+                               responses: list[Response],
+                               on_result: Callable[[EvaluationResult], None] | None = None) -> list[dict[str, int | EvaluationResult]]:
+        """Evaluate every item, passing each result to `on_result` as soon as it is ready."""
         self._total_count = len(questions)
         self._completed_count = 0
         
         semaphore = asyncio.Semaphore(20)  # Limit concurrent evaluations
         
         async def evaluate_single_response(i: int) -> dict[str, int | EvaluationResult]:
-            async with semaphore:
+            with trace_tags(question_index=i):
+                with tracer.span('semaphore_wait'):
+                    await semaphore.acquire()
+                try:
+                    return await evaluate_acquired_response(i)
+                finally:
+                    semaphore.release()
+
+        async def evaluate_acquired_response(i: int) -> dict[str, int | EvaluationResult]:
+            with tracer.span('evaluate_item'):
                 question: str = questions[i]
                 answer: str = answers[i]
                 response_text: str = responses[i].response or ""
@@ -56,22 +128,15 @@ class BinaryEvaluator():
                     self._completed_count += 1
                     if self._completed_count % 10 == 0:
                         print(f"Completed {self._completed_count} of {self._total_count} responses ({(self._completed_count/self._total_count)*100:.1f}%)")
-                    return {
-                        'index': i,
-                        'evaluation': evaluation_result
-                    }
                 except Exception as e:
                     print(f'Error evaluating response {i}: {e}')
-                    return {
-                        'index': i,
-                        'evaluation': EvaluationResult(
-                            query=question,
-                            contexts=None,
-                            response_text="ERROR",
-                            passing=False,
-                            feedback=str(e)
-                        )
-                    }
+                    evaluation_result = self._error_result(question, e)
+                if on_result is not None:
+                    on_result(evaluation_result)
+                return {
+                    'index': i,
+                    'evaluation': evaluation_result
+                }
 
         # Use asyncio.gather to run evaluations in parallel
         tasks: list[Coroutine[Any, Any, dict[str, int | EvaluationResult]]] = [evaluate_single_response(i) for i in range(len(questions))]
@@ -79,3 +144,24 @@ class BinaryEvaluator():
         sorted_results: list[dict[str, EvaluationResult]] = sorted(results, key=lambda x: x['index'])
         evaluations: list[EvaluationResult] = [result['evaluation'] for result in sorted_results]
         return evaluations
+
+    async def evaluate_response(self, question: str, answer: str, response: Response) -> EvaluationResult:
+        """Evaluate a single response, returning an ERROR result instead of raising."""
+        response_text: str = response.response or ""
+        contexts: list[str] = [node.__str__() for node in response.source_nodes]
+        try:
+            with tracer.span('evaluate_item'):
+                return await self._evaluate(response_text, question, answer, contexts)
+        except Exception as e:
+            print(f'Error evaluating response to "{question}": {e}')
+            return self._error_result(question, e)
+
+    def plan_responses(self, questions: list[str], answers: list[str],
+                       responses: list[Response]) -> list[list[PlannedCall]]:
+        """Render the prompts every evaluation would send, without calling the API."""
+        planned_calls: list[list[PlannedCall]] = []
+        for i in range(len(questions)):
+            response_text: str = responses[i].response or ""
+            contexts: list[str] = [node.__str__() for node in responses[i].source_nodes]
+            planned_calls.append(self._plan(response_text, questions[i], answers[i], contexts))
+        return planned_calls
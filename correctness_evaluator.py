@@ -1,27 +1,60 @@
 from typing_extensions import override
-from binary_evaluator import BinaryEvaluator
-from evaluation_result import EvaluationResult
-from evaluation_templates import CORRECTNESS_EVALUATION_TEMPLATE
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.evaluation_plan import PlannedCall
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_templates import (
+    CORRECTNESS_EVALUATION_ITEM_TEMPLATE,
+    CORRECTNESS_EVALUATION_SYSTEM_PROMPT,
+    CORRECTNESS_TERSE_EVALUATION_ITEM_TEMPLATE,
+    CORRECTNESS_TERSE_EVALUATION_SYSTEM_PROMPT,
+)
+from evaluation.judge_backend import JudgeBackend
+from evaluation.tracing import tracer
 
 
 class CorrectnessEvaluator(BinaryEvaluator):
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, model: str = "gpt-4o", terse: bool = False, explain_failures: bool = False,
+                 backend: JudgeBackend | None = None) -> None:
+        super().__init__(model, terse, explain_failures, backend)
+
+    @override
+    def _plan(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> list[PlannedCall]:
+        verbose_prompt = CORRECTNESS_EVALUATION_SYSTEM_PROMPT + CORRECTNESS_EVALUATION_ITEM_TEMPLATE.format(query=question, reference_answer=answer, generated_answer=response_text)
+        if self.terse:
+            prompt = CORRECTNESS_TERSE_EVALUATION_SYSTEM_PROMPT + CORRECTNESS_TERSE_EVALUATION_ITEM_TEMPLATE.format(query=question, reference_answer=answer, generated_answer=response_text)
+            planned_calls = [PlannedCall(kind="correctness", model=self.model, prompt=prompt, expected_output_tokens=60)]
+            if self.explain_failures:
+                planned_calls.append(PlannedCall(kind="correctness_explanation", model=self.model, prompt=verbose_prompt, expected_output_tokens=400, upper_bound=True))
+            return planned_calls
+        return [PlannedCall(kind="correctness", model=self.model, prompt=verbose_prompt, expected_output_tokens=400)]
+
+    async def _evaluate_verbose(self, response_text: str, question: str, answer: str) -> tuple[bool, str]:
+        messages = self._render_messages(
+            CORRECTNESS_EVALUATION_SYSTEM_PROMPT,
+            CORRECTNESS_EVALUATION_ITEM_TEMPLATE.format(query=question, reference_answer=answer, generated_answer=response_text)
+        )
+        content: str = await self._complete(messages)
+        with tracer.span('parse'):
+            return self._extract_result(content), self._extract_feedback(content)
+
+    async def _evaluate_terse(self, response_text: str, question: str, answer: str) -> tuple[bool, str]:
+        messages = self._render_messages(
+            CORRECTNESS_TERSE_EVALUATION_SYSTEM_PROMPT,
+            CORRECTNESS_TERSE_EVALUATION_ITEM_TEMPLATE.format(query=question, reference_answer=answer, generated_answer=response_text)
+        )
+        evaluation_data = await self._judge_structured(messages)
+        if not evaluation_data.passing and self.explain_failures:
+            # Keep the terse verdict; the verbose judge only supplies the explanation
+            _, feedback = await self._evaluate_verbose(response_text, question, answer)
+            return evaluation_data.passing, feedback
+        return evaluation_data.passing, evaluation_data.feedback
         
     @override
     async def _evaluate(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> EvaluationResult:
         if question is None or answer is None or response_text is None:
             raise ValueError("Question, answer, and response must be provided for correctness evaluation")
-        prompt = CORRECTNESS_EVALUATION_TEMPLATE.format(query=question, reference_answer=answer, generated_answer=response_text)
-        completion = await self.llm.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "user", "content":prompt}
-                ],
-            temperature=0.0
-        )
-        if completion.choices[0].message.content is None:
-            raise ValueError("No response from the model")
-        result: bool = self._extract_result(completion.choices[0].message.content)
-        feedback: str = self._extract_feedback(completion.choices[0].message.content)
+        if self.terse:
+            result, feedback = await self._evaluate_terse(response_text, question, answer)
+        else:
+            result, feedback = await self._evaluate_verbose(response_text, question, answer)
         return EvaluationResult(query=question, contexts=contexts, response_text=response_text, passing=result, feedback=feedback)
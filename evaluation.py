@@ -7,6 +7,7 @@ import pickle
 from statistics import mean
 from typing import Any
 
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.base.response.schema import Response
 from llama_index.core.schema import NodeWithScore
 import nest_asyncio
@@ -19,17 +20,27 @@ from backend.question_answering.app.services.answer_service.answer_service impor
 from backend.question_answering.app.services.user_service.sign_in_service import (
     SignInService,
 )
+from evaluation.answer_cache import AnswerCache
 from evaluation.binary_evaluator import BinaryEvaluator
 from evaluation.correctness_evaluator import CorrectnessEvaluator
-from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_plan import EvaluationPlan, EvaluationPlanFormatter, EvaluationPlanner, PlannedCall
+from evaluation.evaluation_result import EvaluationResult, UsageStats, start_usage_scope
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationHistory, EvaluationScheduler, ScheduleOutcome
 from evaluation.faithfulness_evaluator import FaithfulnessEvaluator
 from evaluation.guideline_compliance_evaluator import GuidelineComplianceEvaluator
+from evaluation.judge_backend import MicroBatchingBackend
 from evaluation.relevancy_evaluator import RelevancyEvaluator
+from evaluation.results_store import ResultsStore
+from evaluation.tracing import trace_tags, tracer
 
 nest_asyncio.apply()
 import logging
 logging.getLogger().setLevel(logging.ERROR)
 
+# Verdicts are written to the results store in batches of this size as they
+# arrive, so a crashed or interrupted run keeps what it had judged
+RESULTS_STORE_BATCH_SIZE = 20
+
 @dataclass
 class EvaluationSummary:
     category: str
@@ -115,6 +126,26 @@ class EvaluationReportFormatter:
         for category, metrics in report['detailed_metrics'].items():
             output.append(f"{category.upper()} Pass Rate: {metrics['passing_rate']:.2%}")
             
+        usage = {category: stats for category, stats in report.get('usage', {}).items() if stats.calls}
+        if usage:
+            output.append("\nPrompt Cache:")
+            for category, stats in usage.items():
+                output.append(f"{category.upper()}: {stats.calls} calls, {stats.cached_tokens:,} of {stats.prompt_tokens:,} "
+                              f"prompt tokens cached ({stats.cache_hit_rate:.2%})")
+
+        if report.get('batching'):
+            output.append("\nJudge Batching:")
+            for category, stats in report['batching'].items():
+                output.append(f"{category.upper()}: {stats.format()}")
+
+        skipped = {category: queries for category, queries in report.get('skipped', {}).items() if queries}
+        if skipped:
+            output.append("\nSkipped (deadline or budget reached):")
+            for category, queries in skipped.items():
+                output.append(f"{category.upper()}: {len(queries)} not evaluated")
+                for query in queries:
+                    output.append(f"  - {query}")
+
         output.append("\nLLM Analysis:")
         output.append(report['llm_analysis'])
         
@@ -152,8 +183,13 @@ class ResponseEvaluationPipeline:
         model: str,
         evaluators: dict[str, BinaryEvaluator],
         output_dir: str = "evaluation",
+        results_store: ResultsStore | None = None,
     ):
         self.evaluators: dict[str, BinaryEvaluator] = evaluators
+        self.results_store: ResultsStore | None = results_store
+        self.run_id: str | None = None
+        self.run_usage: dict[int, UsageStats] = {}
+        self._unstored: dict[str, list[EvaluationResult]] = {}
         self.llm: OpenAI = llm
         self.version: int = version
         self.description: str = description
@@ -163,8 +199,36 @@ class ResponseEvaluationPipeline:
         
     def _save_temp_results(self, result_name: str, results: list[EvaluationResult]):
         results_file_path = os.path.join(self.output_dir, f'{result_name}.pkl')
-        with open(results_file_path, 'wb') as f:
+        with tracer.span('checkpoint', result_name=result_name), open(results_file_path, 'wb') as f:
             pickle.dump(results, f)
+
+    def _record_result(self, category: str, result: EvaluationResult):
+        """Queue one verdict for the results store, writing a batch once enough have arrived."""
+        if self.results_store is None or self.run_id is None:
+            return
+        self._unstored.setdefault(category, []).append(result)
+        if len(self._unstored[category]) >= RESULTS_STORE_BATCH_SIZE:
+            self._flush_results(category)
+
+    def _flush_results(self, category: str | None = None):
+        for flushed in [category] if category is not None else list(self._unstored):
+            results = self._unstored.pop(flushed, [])
+            if results and self.results_store is not None and self.run_id is not None:
+                with tracer.span('results_store_write', category=flushed, results=len(results)):
+                    self.results_store.add_results(self.run_id, self.version, flushed, results)
+
+    def _record_results(self, category: str, results: list[EvaluationResult]):
+        """Checkpoint a finished category; its verdicts already went to the store through _record_result."""
+        self._save_temp_results(f"{category}_eval_results", results)
+        self._flush_results(category)
+
+    def _start_run(self):
+        for evaluator in self.evaluators.values():
+            evaluator.start_run()
+        self.run_usage = start_usage_scope()
+        self._unstored = {}
+        if self.results_store is not None:
+            self.run_id = self.results_store.start_run(self.version, self.description, self.model)
             
     async def evaluate_responses(
         self,
@@ -180,30 +244,97 @@ class ResponseEvaluationPipeline:
 
         """Evaluate a list of responses against questions and correct answers with retry on failure."""
         eval_results = {}
+        self._start_run()
         try:
             for category, evaluator in self.evaluators.items():
                 print(f"Evaluating {category}...")
-                eval_results[category] = await evaluator.evaluate_responses(questions=questions, answers=correct_answers, responses=responses)
-                self._save_temp_results(f"{category}_eval_results", eval_results[category])
+                with trace_tags(category=category), tracer.span('category', model=evaluator.model):
+                    eval_results[category] = await evaluator.evaluate_responses(
+                        questions=questions, answers=correct_answers, responses=responses,
+                        on_result=lambda result, category=category: self._record_result(category, result))
+                    self._record_results(category, eval_results[category])
         except Exception as e:
             print("ERROR: ", e)
             raise e 
+        finally:
+            self._flush_results()
         
         return eval_results
 
-    def generate_report(self, evaluation_results: dict[str, list[EvaluationResult]], responses_processed:int) -> dict[str, Any]:
-        """Generate a comprehensive evaluation report."""
+    async def evaluate_responses_scheduled(
+        self,
+        responses: list[Response],
+        questions: list[str],
+        correct_answers: list[str],
+        scheduler: EvaluationScheduler,
+        limit: int = 500,
+        budget: EvaluationBudget | None = None
+    ) -> ScheduleOutcome:
+        """Evaluate in priority order until the scheduler's deadline or budget is nearly used up."""
+        responses = responses[:limit]
+        questions = questions[:limit]
+        correct_answers = correct_answers[:limit]
+
+        self._start_run()
+        try:
+            outcome = await scheduler.run(self.evaluators, questions, correct_answers, responses, budget=budget,
+                                          on_result=lambda category, _, result: self._record_result(category, result))
+        finally:
+            self._flush_results()
+        for category, results in outcome.results.items():
+            self._record_results(category, results)
+            print(f"{category}: evaluated {len(outcome.evaluated[category])}, skipped {len(outcome.skipped[category])}")
+        return outcome
+
+    def plan_evaluation(
+        self,
+        responses: list[Response],
+        questions: list[str],
+        correct_answers: list[str],
+        planner: EvaluationPlanner,
+        limit: int = 500
+    ) -> EvaluationPlan:
+        """Estimate the calls, tokens, cost and wall time of an evaluation without calling the API."""
+        responses = responses[:limit]
+        questions = questions[:limit]
+        correct_answers = correct_answers[:limit]
+
+        planned_calls: dict[str, list[list[PlannedCall]]] = {}
+        for category, evaluator in self.evaluators.items():
+            planned_calls[category] = evaluator.plan_responses(questions=questions, answers=correct_answers, responses=responses)
+
+        empty_metrics = {'passing_rate': 0.0, 'distribution_stats': EvaluationMetrics.get_distribution_stats([])}
+        analysis_prompt = EvaluationReportFormatter.generate_llm_analysis_prompt({
+            'overall_score': 0.0,
+            'detailed_metrics': {category: empty_metrics for category in self.evaluators}
+        })
+        planned_calls['report'] = [[PlannedCall(kind="llm_analysis", model="gpt-4o", prompt=analysis_prompt, expected_output_tokens=500)]]
+        return planner.plan(planned_calls)
+
+    def generate_report(self, evaluation_results: dict[str, list[EvaluationResult]], responses_processed:int,
+                        skipped: dict[str, list[str]] | None = None, include_usage: bool = True) -> dict[str, Any]:
+        """Generate a comprehensive evaluation report.
+
+        Leave out judge usage and batching with `include_usage=False` when the
+        judge calls were shared with other runs and cannot be attributed to this one.
+        """
         report: dict[str, Any] = {
             'category_summaries': {},
             'overall_score': 0.0,
             'llm_analysis': '',
             'detailed_metrics': {},
-            'responses_processed': responses_processed
+            'responses_processed': responses_processed,
+            'usage': {},
+            'skipped': skipped or {},
+            'batching': {}
         }
         
         normalized_averages = []
         for category, results in evaluation_results.items():
             filtered_results = [r for r in results if r.response_text != "ERROR"]
+            if not filtered_results:
+                # Nothing finished for this category, e.g. the scheduler ran out of budget
+                continue
             sorted_results = sorted(filtered_results, key=lambda x: (1 if x.passing else 0, x.query), reverse=True)
             
             top_3 = sorted_results[:3]
@@ -221,18 +352,26 @@ class ResponseEvaluationPipeline:
             
             report['detailed_metrics'][category] = metrics
             normalized_averages.append(metrics['passing_rate'])
+            if include_usage and category in self.evaluators:
+                usage = self.run_usage.get(id(self.evaluators[category].usage))
+                if usage is not None:
+                    report['usage'][category] = usage
+                backend = getattr(self.evaluators[category], 'backend', None)
+                if isinstance(backend, MicroBatchingBackend):
+                    report['batching'][category] = backend.stats
         
-        report['overall_score'] = mean(normalized_averages)
+        report['overall_score'] = mean(normalized_averages) if normalized_averages else 0.0
         
         # Generate LLM analysis
         analysis_prompt = EvaluationReportFormatter.generate_llm_analysis_prompt(report)
-        report['llm_analysis'] = self.llm.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "user", "content": analysis_prompt}
-            ],
-            temperature=0.0
-        ).choices[0].message.content
+        with tracer.span('llm_analysis', model="gpt-4o"):
+            report['llm_analysis'] = self.llm.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "user", "content": analysis_prompt}
+                ],
+                temperature=0.0
+            ).choices[0].message.content
         
         return report
 
@@ -267,39 +406,100 @@ class ResponseEvaluationPipeline:
         with open(output_path, 'w') as f:
             f.write(final_report)
 
+def load_golden_dataset() -> tuple[list[str], list[str]]:
+    """Sign in and fetch the golden questions and reference answers."""
+    sign_in_service = SignInService()
+    sign_in_service.sign_in()
+    golden_dataset = supabase_client.schema('question_answering').table('golden_dataset').select('*').execute()
+    questions = [d['question'] for d in golden_dataset.data]
+    answers = [d['answer'] for d in golden_dataset.data]
+    return questions, answers
+
+
+def load_responses(responses_file: str) -> list[Response]:
+    """Load a pickled list of responses, aligned with the golden dataset by position."""
+    with open(responses_file, 'rb') as file:
+        responses = pickle.load(file)
+    if not all(isinstance(response, Response) for response in responses):
+        raise ValueError(f"Invalid response types found in {responses_file}")
+    return responses
+
+
 class EvaluationRunner:
-    def __init__(self, version: int, description: str, model: str, evaluators: dict[str, BinaryEvaluator]):
-        self.output_dir = f"evaluation_v{version}"
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        model: str,
+        evaluators: dict[str, BinaryEvaluator],
+        retriever_config: dict[str, Any] | None = None,
+        use_answer_cache: bool = False,
+        pipeline_id: str | None = None,
+        embed_model: BaseEmbedding | None = None,
+        results_store: ResultsStore | None = None,
+        llm: OpenAI | None = None,
+        golden_dataset: tuple[list[str], list[str]] | None = None,
+        output_dir: str | None = None,
+    ):
+        self.results_store: ResultsStore = results_store or ResultsStore()
+        self.output_dir = output_dir or f"evaluation_v{version}"
+        self.answer_cache: AnswerCache | None = None
+        if use_answer_cache:
+            if retriever_config is None or pipeline_id is None:
+                raise ValueError("The answer cache requires the retriever config and pipeline id the answers are generated with")
+            # Nothing here can tell when the answer pipeline's code or prompts change,
+            # so the caller identifies them with pipeline_id (e.g. a git commit)
+            self.answer_cache = AnswerCache(
+                version=version,
+                retriever_config=retriever_config,
+                pipeline_id=pipeline_id,
+                embed_model=embed_model
+            )
         self.pipeline = ResponseEvaluationPipeline(
-            llm=OpenAI(),
+            llm=llm or OpenAI(),
             version=version,
             description=description,
             model=model,
             evaluators=evaluators,
-            output_dir=self.output_dir
+            output_dir=self.output_dir,
+            results_store=self.results_store
         )
-        sign_in_service = SignInService()
-        sign_in_service.sign_in()     
-        self.questions, self.correct_answers = self._load_golden_dataset()
-
-    def _load_golden_dataset(self):
-        golden_dataset = supabase_client.schema('question_answering').table('golden_dataset').select('*').execute()
-        questions = [d['question'] for d in golden_dataset.data]
-        answers = [d['answer'] for d in golden_dataset.data]
-        return questions, answers    
-        
+        # Pass golden_dataset to share one sign-in and download across runners
+        self.questions, self.correct_answers = golden_dataset or load_golden_dataset()
+
+
     def _generate_responses(self, answers, source_nodes):
         return [Response(answer, source_nodes) for answer, source_nodes in zip(answers, source_nodes)]
 
     def _generate_answers(self, limit: int = 50) -> tuple[list[str], list[list[NodeWithScore]]]:
-        answer_service = AnswerService()
         questions = self.questions[:limit]
         async def answer_questions_in_parallel(questions: list[str]):
-            async def semaphored_process(question: str):
-                async with asyncio.Semaphore(6):
-                    return await answer_service.answer_question(question)
+            responses: list[tuple[str, list[NodeWithScore]] | None] = [None] * len(questions)
+            if self.answer_cache is not None:
+                for i, question in enumerate(questions):
+                    cached = await self.answer_cache.get(question)
+                    if cached is not None:
+                        responses[i] = (cached.answer, cached.source_nodes)
+                print(f"Answer cache: {self.answer_cache.hits} hits, {self.answer_cache.misses} misses")
 
-            responses = await asyncio.gather(*(semaphored_process(question) for question in questions))
+            missing: list[int] = [i for i, response in enumerate(responses) if response is None]
+            if not missing:
+                return responses
+
+            answer_service = AnswerService()
+            semaphore = asyncio.Semaphore(6)
+            async def semaphored_process(i: int):
+                async with semaphore:
+                    with tracer.span('answer_generation', question_index=i):
+                        return await answer_service.answer_question(questions[i])
+
+            answered = await asyncio.gather(*(semaphored_process(i) for i in missing))
+            for i, (answer, source_nodes) in zip(missing, answered):
+                responses[i] = (answer, source_nodes)
+                if self.answer_cache is not None:
+                    await self.answer_cache.put(questions[i], answer, source_nodes)
+            if self.answer_cache is not None:
+                self.answer_cache.save()
             return responses
 
         # Call the async function to get answers
@@ -310,31 +510,63 @@ class EvaluationRunner:
     def _load_or_generate_responses(self, responses_file: str | None, limit: int) -> list[Response]:
         if responses_file is not None and os.path.exists(responses_file):
             print(f"Loading responses from {responses_file}...")
-            with open(responses_file, 'rb') as file:
-                responses = pickle.load(file)
-            
-            # Ensure all loaded responses are of type Response
-            if all(isinstance(response, Response) for response in responses):
+            try:
+                responses = load_responses(responses_file)
                 print("Responses loaded successfully.")
                 return responses
-            else:
+            except ValueError:
                 print("Invalid response types found. Generating new responses...")
         
         print(f"{responses_file} not found or invalid. Generating new responses...")
         answers, source_nodes = self._generate_answers(limit)
         return self._generate_responses(answers, source_nodes)
     
-    async def run(self, responses_file: str | None = None, limit: int = 500):
-        responses = self._load_or_generate_responses(responses_file, limit)
+    def plan(self, responses_file: str, limit: int = 500, planner: EvaluationPlanner | None = None) -> EvaluationPlan:
+        """Render every prompt offline and project the cost and wall time of a run."""
+        # Generating responses would call the answer service, so a dry run needs them on disk
+        if not os.path.exists(responses_file):
+            raise ValueError(f"{responses_file} not found. A dry run requires saved responses.")
+        responses = load_responses(responses_file)
+        return self.pipeline.plan_evaluation(responses, self.questions, self.correct_answers, planner or EvaluationPlanner(), limit=limit)
 
-        print("Evaluating responses...")
-        eval_results = await self.pipeline.evaluate_responses(responses, self.questions, self.correct_answers, limit=limit)
+    async def run(self, responses_file: str | None = None, limit: int = 500, dry_run: bool = False,
+                  budget: EvaluationBudget | None = None, trace: bool = False):
+        if dry_run:
+            if responses_file is None:
+                raise ValueError("A dry run requires a responses file")
+            print(EvaluationPlanFormatter.format_plan(self.plan(responses_file, limit)))
+            return
 
-        print("Generating report...")
-        report: dict[str, Any] = self.pipeline.generate_report(eval_results, responses_processed=limit)
-        
-        print("Saving report...")
-        self.pipeline.save_report(report)
+        if trace:
+            tracer.enable()
+        try:
+            responses = self._load_or_generate_responses(responses_file, limit)
+
+            print("Evaluating responses...")
+            skipped: dict[str, list[str]] = {}
+            if budget is None:
+                eval_results = await self.pipeline.evaluate_responses(responses, self.questions, self.correct_answers, limit=limit)
+                responses_processed = limit
+            else:
+                scheduler = EvaluationScheduler(budget, history=EvaluationHistory.from_store(self.results_store))
+                outcome = await self.pipeline.evaluate_responses_scheduled(responses, self.questions, self.correct_answers, scheduler, limit=limit)
+                eval_results = outcome.results
+                skipped = {category: [self.questions[i] for i in indices] for category, indices in outcome.skipped.items()}
+                responses_processed = len({i for indices in outcome.evaluated.values() for i in indices})
+
+            print("Generating report...")
+            with tracer.span('generate_report'):
+                report: dict[str, Any] = self.pipeline.generate_report(eval_results, responses_processed=responses_processed, skipped=skipped)
+            
+            print("Saving report...")
+            self.pipeline.save_report(report)
+        finally:
+            if trace:
+                # Export a failed run's trace too; it shows how far the run got
+                trace_path = os.path.join(self.output_dir, f'trace_p{self.pipeline.version}.json')
+                tracer.export(trace_path)
+                tracer.disable()
+                print(f"Trace written to {trace_path} (open in https://ui.perfetto.dev)")
         
         print("Done!")
         
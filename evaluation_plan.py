@@ -0,0 +1,226 @@
+from dataclasses import dataclass, field
+import functools
+import math
+from typing import Any
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to a character heuristic when tiktoken is unavailable
+    tiktoken = None
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str) -> Any | None:
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken downloads its BPE files on first use, which fails offline
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Count tokens locally, without calling the API."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text))
+
+
+@dataclass
+class PlannedCall:
+    kind: str
+    model: str
+    prompt: str
+    expected_output_tokens: int
+    upper_bound: bool = False
+
+
+@dataclass
+class ModelProfile:
+    input_cost_per_1m: float
+    output_cost_per_1m: float
+    requests_per_minute: int
+    tokens_per_minute: int
+    first_token_latency_s: float
+    output_tokens_per_s: float
+
+    def call_latency(self, output_tokens: int) -> float:
+        return self.first_token_latency_s + output_tokens / self.output_tokens_per_s
+
+
+DEFAULT_MODEL_PROFILES: dict[str, ModelProfile] = {
+    'gpt-4o': ModelProfile(
+        input_cost_per_1m=2.50,
+        output_cost_per_1m=10.00,
+        requests_per_minute=5000,
+        tokens_per_minute=800_000,
+        first_token_latency_s=0.6,
+        output_tokens_per_s=80.0,
+    ),
+    'gpt-4o-mini': ModelProfile(
+        input_cost_per_1m=0.15,
+        output_cost_per_1m=0.60,
+        requests_per_minute=5000,
+        tokens_per_minute=4_000_000,
+        first_token_latency_s=0.4,
+        output_tokens_per_s=100.0,
+    ),
+    'gpt-3.5-turbo': ModelProfile(
+        input_cost_per_1m=0.50,
+        output_cost_per_1m=1.50,
+        requests_per_minute=3500,
+        tokens_per_minute=160_000,
+        first_token_latency_s=0.4,
+        output_tokens_per_s=100.0,
+    ),
+}
+
+
+# Latency stand-in for models without a profile, e.g. a self-hosted judge; only
+# deadlines use it, so such models can be scheduled as long as no cost limit is set
+FALLBACK_LATENCY_PROFILE: ModelProfile = DEFAULT_MODEL_PROFILES['gpt-4o']
+
+
+@dataclass
+class CallEstimate:
+    kind: str
+    model: str
+    calls: int = 0
+    upper_bound_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+
+
+@dataclass
+class CategoryPlan:
+    category: str
+    items: int
+    estimates: dict[str, CallEstimate] = field(default_factory=dict)
+    wall_time_s: float = 0.0
+
+    @property
+    def calls(self) -> int:
+        return sum(e.calls for e in self.estimates.values())
+
+    @property
+    def cost(self) -> float:
+        return sum(e.cost for e in self.estimates.values())
+
+
+@dataclass
+class EvaluationPlan:
+    categories: dict[str, CategoryPlan]
+    concurrency: int
+
+    @property
+    def total_calls(self) -> int:
+        return sum(c.calls for c in self.categories.values())
+
+    @property
+    def total_cost(self) -> float:
+        return sum(c.cost for c in self.categories.values())
+
+    @property
+    def total_wall_time_s(self) -> float:
+        # Categories are evaluated one after another by ResponseEvaluationPipeline
+        return sum(c.wall_time_s for c in self.categories.values())
+
+
+class EvaluationPlanner:
+    def __init__(self, model_profiles: dict[str, ModelProfile] | None = None, concurrency: int = 20):
+        self.model_profiles: dict[str, ModelProfile] = model_profiles or DEFAULT_MODEL_PROFILES
+        self.concurrency: int = concurrency
+
+    def _profile(self, model: str) -> ModelProfile:
+        if model not in self.model_profiles:
+            raise ValueError(f"No model profile configured for {model}")
+        return self.model_profiles[model]
+
+    def estimate_item(self, planned_calls: list[PlannedCall], with_cost: bool = True) -> tuple[int, float, float]:
+        """Estimate the tokens, cost and sequential latency of one item's calls.
+
+        Without `with_cost` the cost is 0 and models need no profile.
+        """
+        tokens, cost, latency = 0, 0.0, 0.0
+        for call in planned_calls:
+            input_tokens = count_tokens(call.prompt, call.model)
+            tokens += input_tokens + call.expected_output_tokens
+            if with_cost:
+                profile = self._profile(call.model)
+                cost += (input_tokens * profile.input_cost_per_1m
+                         + call.expected_output_tokens * profile.output_cost_per_1m) / 1_000_000
+            else:
+                profile = self.model_profiles.get(call.model, FALLBACK_LATENCY_PROFILE)
+            latency += profile.call_latency(call.expected_output_tokens)
+        return tokens, cost, latency
+
+    def plan_category(self, category: str, planned_calls: list[list[PlannedCall]]) -> CategoryPlan:
+        """Aggregate the planned calls of every item in a category into estimates."""
+        plan = CategoryPlan(category=category, items=len(planned_calls))
+        item_latencies: list[float] = []
+        for item_calls in planned_calls:
+            item_latency = 0.0
+            for call in item_calls:
+                profile = self._profile(call.model)
+                estimate = plan.estimates.setdefault(call.kind, CallEstimate(kind=call.kind, model=call.model))
+                input_tokens = count_tokens(call.prompt, call.model)
+                estimate.calls += 1
+                estimate.upper_bound_calls += 1 if call.upper_bound else 0
+                estimate.input_tokens += input_tokens
+                estimate.output_tokens += call.expected_output_tokens
+                estimate.cost += (input_tokens * profile.input_cost_per_1m
+                                  + call.expected_output_tokens * profile.output_cost_per_1m) / 1_000_000
+                # Calls within one item run sequentially
+                item_latency += profile.call_latency(call.expected_output_tokens)
+            item_latencies.append(item_latency)
+        plan.wall_time_s = self._project_wall_time(plan, item_latencies)
+        return plan
+
+    def _project_wall_time(self, plan: CategoryPlan, item_latencies: list[float]) -> float:
+        if not item_latencies:
+            return 0.0
+        latency_bound = max(sum(item_latencies) / self.concurrency, max(item_latencies))
+        rate_bounds: list[float] = []
+        for model in {e.model for e in plan.estimates.values()}:
+            profile = self._profile(model)
+            estimates = [e for e in plan.estimates.values() if e.model == model]
+            calls = sum(e.calls for e in estimates)
+            tokens = sum(e.input_tokens + e.output_tokens for e in estimates)
+            rate_bounds.append(calls / profile.requests_per_minute * 60)
+            rate_bounds.append(tokens / profile.tokens_per_minute * 60)
+        return max([latency_bound] + rate_bounds)
+
+    def plan(self, planned_calls: dict[str, list[list[PlannedCall]]]) -> EvaluationPlan:
+        return EvaluationPlan(
+            categories={category: self.plan_category(category, calls) for category, calls in planned_calls.items()},
+            concurrency=self.concurrency
+        )
+
+
+class EvaluationPlanFormatter:
+    @staticmethod
+    def format_plan(plan: EvaluationPlan) -> str:
+        """Format the evaluation plan as a readable string."""
+        output: list[Any] = []
+        output.append("=== EVALUATION PLAN (DRY RUN) ===\n")
+        output.append(f"Concurrency: {plan.concurrency}")
+        for category, category_plan in plan.categories.items():
+            output.append(f"\n{category.upper()} ({category_plan.items} items)")
+            for estimate in category_plan.estimates.values():
+                calls = f"{estimate.calls} calls"
+                if estimate.upper_bound_calls:
+                    calls += f" (up to; {estimate.upper_bound_calls} depend on unknown relevance)"
+                output.append(f"  {estimate.kind} [{estimate.model}]: {calls}")
+                output.append(f"    Input tokens: {estimate.input_tokens:,}  Output tokens (est.): {estimate.output_tokens:,}")
+                output.append(f"    Cost: ${estimate.cost:.4f}")
+            output.append(f"  Projected wall time: {category_plan.wall_time_s:.1f}s")
+        output.append(f"\nTotal calls: {plan.total_calls}")
+        output.append(f"Total cost: ${plan.total_cost:.4f}")
+        output.append(f"Total projected wall time: {plan.total_wall_time_s:.1f}s")
+        return "\n".join(output)
@@ -1,5 +1,6 @@
-
+from contextvars import ContextVar
 from dataclasses import dataclass
+from typing import Any
 
 
 @dataclass
@@ -9,4 +10,52 @@ class EvaluationResult:
     response_text: str
     passing: bool
     feedback: str
-    
\ No newline at end of file
+    
+
+# Usage of the current run, keyed by id() of the UsageStats it was recorded on
+_run_usage: ContextVar[dict[int, "UsageStats"] | None] = ContextVar('run_usage', default=None)
+
+
+def start_usage_scope() -> dict[int, "UsageStats"]:
+    """Also collect usage recorded by the current task, and tasks it starts, into a fresh dict.
+
+    Evaluators are shared across runs, so their own UsageStats are lifetime
+    totals; the scope holds what a single run used.
+    """
+    scope: dict[int, UsageStats] = {}
+    _run_usage.set(scope)
+    return scope
+
+
+@dataclass
+class UsageStats:
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+    def reset(self) -> None:
+        self.calls = self.prompt_tokens = self.cached_tokens = self.completion_tokens = 0
+
+    def record(self, completion: Any) -> None:
+        """Add the token usage reported on a chat completion."""
+        usage = completion.usage
+        if usage is None:
+            return
+        # Self-hosted servers may not report cached tokens
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (details.cached_tokens or 0) if details is not None else 0
+        self._add(usage.prompt_tokens, cached_tokens, usage.completion_tokens)
+        scope = _run_usage.get()
+        if scope is not None:
+            scope.setdefault(id(self), UsageStats())._add(usage.prompt_tokens, cached_tokens, usage.completion_tokens)
+
+    def _add(self, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> None:
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
@@ -0,0 +1,207 @@
+import asyncio
+from collections import defaultdict, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import itertools
+import random
+import time
+
+from llama_index.core.base.response.schema import Response
+
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.evaluation_plan import EvaluationPlanner
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.results_store import ResultsStore
+from evaluation.tracing import trace_tags, tracer
+
+
+@dataclass
+class EvaluationBudget:
+    deadline_s: float | None = None
+    max_tokens: int | None = None
+    max_cost: float | None = None
+    # Fraction of each limit held back so the run finishes, and the report is written, in time
+    reserve_fraction: float = 0.1
+
+
+class EvaluationHistory:
+    """Per-(category, question) evaluation and failure counts from earlier runs."""
+    def __init__(self):
+        self.evaluations: dict[tuple[str, str], int] = defaultdict(int)
+        self.failures: dict[tuple[str, str], int] = defaultdict(int)
+
+    def add(self, category: str, results: list[EvaluationResult]):
+        for result in results:
+            if result.response_text == "ERROR":
+                continue
+            self.evaluations[(category, result.query)] += 1
+            if not result.passing:
+                self.failures[(category, result.query)] += 1
+
+    @classmethod
+    def from_store(cls, store: ResultsStore, legacy_root: str = ".") -> "EvaluationHistory":
+        """Read evaluation and failure counts from the results warehouse.
+
+        An empty warehouse is first backfilled from the evaluation_v* pickles under
+        `legacy_root`, so switching to the warehouse keeps the history of earlier runs.
+        """
+        if store.is_empty():
+            store.import_legacy_results(legacy_root)
+        history = cls()
+        for category, question, evaluations, failures in store.verdict_counts():
+            history.evaluations[(category, question)] = evaluations
+            history.failures[(category, question)] = failures
+        return history
+
+    def coverage(self, category: str, question: str) -> int:
+        return self.evaluations.get((category, question), 0)
+
+    def failure_rate(self, category: str, question: str) -> float:
+        evaluations = self.coverage(category, question)
+        # Unseen items are treated as a coin flip
+        return self.failures.get((category, question), 0) / evaluations if evaluations else 0.5
+
+
+@dataclass
+class ScheduledItem:
+    category: str
+    index: int
+    priority: float
+    tokens: int
+    cost: float
+    latency_s: float
+
+
+@dataclass
+class ScheduleOutcome:
+    results: dict[str, list[EvaluationResult]] = field(default_factory=dict)
+    evaluated: dict[str, list[int]] = field(default_factory=dict)
+    skipped: dict[str, list[int]] = field(default_factory=dict)
+    tokens_used: int = 0
+    cost_used: float = 0.0
+    elapsed_s: float = 0.0
+
+
+class EvaluationScheduler:
+    """Runs (category, question) evaluations in priority order within a deadline and budget.
+
+    Items with the least historical coverage and the highest historical failure
+    rate go first. Whenever a slot frees up, the next item comes from the
+    category with the least coverage in this run, so a tight budget is spread
+    across categories; ties between questions are broken in a shuffled order,
+    so a truncated run does not just cover the first questions.
+
+    Each item is charged its dry-run estimate when it starts, and an item is not
+    started if its estimate would overrun what is left of the budget after the
+    reserve. The budget is estimate-based: the tokens and cost actually used are
+    not reconciled against it. Concurrent runs on one scheduler share its
+    concurrency limit.
+    """
+    def __init__(
+        self,
+        budget: EvaluationBudget,
+        history: EvaluationHistory | None = None,
+        planner: EvaluationPlanner | None = None,
+        concurrency: int = 20,
+        seed: int | None = 0,
+    ):
+        self.budget: EvaluationBudget = budget
+        self.history: EvaluationHistory = history or EvaluationHistory()
+        self.planner: EvaluationPlanner = planner or EvaluationPlanner()
+        self.concurrency: int = concurrency
+        self.semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrency)
+        self._random: random.Random = random.Random(seed)
+
+    def _priority(self, category: str, question: str) -> float:
+        return self.history.failure_rate(category, question) + 1 / (1 + self.history.coverage(category, question))
+
+    def prioritize(self, evaluators: dict[str, BinaryEvaluator], questions: list[str], answers: list[str],
+                   responses: list[Response], budget: EvaluationBudget | None = None) -> list[ScheduledItem]:
+        """Order each category's items by priority, then interleave the categories round-robin.
+
+        Items are only priced when `budget` (or the scheduler's own) limits cost,
+        so judges without a model profile run under any other budget.
+        """
+        with_cost = (budget or self.budget).max_cost is not None
+        tiebreak = list(range(len(questions)))
+        self._random.shuffle(tiebreak)
+        per_category: list[list[ScheduledItem]] = []
+        for category, evaluator in evaluators.items():
+            items: list[ScheduledItem] = []
+            planned_calls = evaluator.plan_responses(questions=questions, answers=answers, responses=responses)
+            for i, calls in enumerate(planned_calls):
+                tokens, cost, latency_s = self.planner.estimate_item(calls, with_cost=with_cost)
+                items.append(ScheduledItem(category, i, self._priority(category, questions[i]), tokens, cost, latency_s))
+            per_category.append(sorted(items, key=lambda item: (-item.priority, tiebreak[item.index])))
+        return [item for items in itertools.zip_longest(*per_category) for item in items if item is not None]
+
+    def _fits(self, item: ScheduledItem, outcome: ScheduleOutcome, start: float, budget: EvaluationBudget) -> bool:
+        keep = 1 - budget.reserve_fraction
+        if budget.deadline_s is not None and time.monotonic() - start + item.latency_s > budget.deadline_s * keep:
+            return False
+        if budget.max_tokens is not None and outcome.tokens_used + item.tokens > budget.max_tokens * keep:
+            return False
+        if budget.max_cost is not None and outcome.cost_used + item.cost > budget.max_cost * keep:
+            return False
+        return True
+
+    async def run(self, evaluators: dict[str, BinaryEvaluator], questions: list[str], answers: list[str],
+                  responses: list[Response], budget: EvaluationBudget | None = None,
+                  on_result: Callable[[str, int, EvaluationResult], None] | None = None) -> ScheduleOutcome:
+        """Evaluate within `budget`, or the scheduler's own budget when none is given.
+
+        `on_result(category, index, result)` is called as each item finishes.
+        """
+        budget = budget or self.budget
+        start = time.monotonic()
+        outcome = ScheduleOutcome(
+            evaluated={category: [] for category in evaluators},
+            skipped={category: [] for category in evaluators}
+        )
+        finished: dict[str, dict[int, EvaluationResult]] = {category: {} for category in evaluators}
+        pending: dict[str, deque[ScheduledItem]] = {category: deque() for category in evaluators}
+        for item in self.prioritize(evaluators, questions, answers, responses, budget):
+            pending[item.category].append(item)
+        totals: dict[str, int] = {category: len(items) for category, items in pending.items()}
+        started: dict[str, int] = {category: 0 for category in evaluators}
+
+        def next_item() -> ScheduledItem | None:
+            categories = [category for category in pending if pending[category]]
+            if not categories:
+                return None
+            # The category with the least coverage so far in this run goes next
+            category = min(categories, key=lambda category: started[category] / totals[category])
+            return pending[category].popleft()
+
+        async def worker():
+            while True:
+                with tracer.span('semaphore_wait'):
+                    await self.semaphore.acquire()
+                try:
+                    # Pick and check the budget only once a slot is free, i.e. just before the calls start
+                    item = next_item()
+                    if item is None:
+                        return
+                    if not self._fits(item, outcome, start, budget):
+                        outcome.skipped[item.category].append(item.index)
+                        continue
+                    started[item.category] += 1
+                    outcome.tokens_used += item.tokens
+                    outcome.cost_used += item.cost
+                    with trace_tags(category=item.category, question_index=item.index):
+                        result = await evaluators[item.category].evaluate_response(
+                            questions[item.index], answers[item.index], responses[item.index])
+                    finished[item.category][item.index] = result
+                    if on_result is not None:
+                        on_result(item.category, item.index, result)
+                finally:
+                    self.semaphore.release()
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        for category in evaluators:
+            outcome.evaluated[category] = sorted(finished[category])
+            outcome.results[category] = [finished[category][i] for i in outcome.evaluated[category]]
+            outcome.skipped[category].sort()
+        outcome.elapsed_s = time.monotonic() - start
+        return outcome
@@ -0,0 +1,318 @@
+"""Long-running evaluation service with a local HTTP API.
+
+Keeps the judge clients and their caches, the results warehouse and the golden
+dataset warm between evaluations, so a submission only pays for its judge calls.
+
+    POST /evaluations               application/json {"version", "responses_file" | "responses", ...}
+    POST /evaluations?version=16    application/x-ndjson, one {"question", "response", "contexts"} per line
+    GET  /evaluations               status of every submission
+    GET  /evaluations/<id>          status, and results and report once done
+    GET  /health
+
+Add `wait=1` to a POST to hold the request open until the report is ready.
+A `responses_file` is only accepted when the service has a `responses_dir`,
+and is resolved inside it. Every submission runs through one
+EvaluationScheduler, so concurrent submissions share its concurrency limit
+instead of each opening their own. Judge usage in a report is the
+submission's own; batching stats are cumulative since the service started.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any
+from urllib.parse import parse_qsl, urlparse
+import uuid
+
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import NodeWithScore, TextNode
+from openai import OpenAI
+
+from evaluation.answer_cache import normalize_question
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import EvaluationReportFormatter, ResponseEvaluationPipeline, load_golden_dataset, load_responses
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationHistory, EvaluationScheduler
+from evaluation.faithfulness_evaluator import FaithfulnessEvaluator
+from evaluation.guideline_compliance_evaluator import GuidelineComplianceEvaluator
+from evaluation.relevancy_evaluator import RelevancyEvaluator
+from evaluation.results_store import ResultsStore
+
+
+@dataclass
+class Submission:
+    submission_id: str
+    version: int
+    description: str
+    model: str
+    questions: list[str]
+    answers: list[str]
+    responses: list[Response]
+    budget: EvaluationBudget | None = None
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    results: dict[str, list[EvaluationResult]] = field(default_factory=dict)
+    report: dict[str, Any] | None = None
+    error: str | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def to_json(self) -> dict[str, Any]:
+        body: dict[str, Any] = {
+            'id': self.submission_id,
+            'status': self.status,
+            'version': self.version,
+            'description': self.description,
+            'model': self.model,
+            'items': len(self.questions),
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+        if self.report is not None:
+            body['report'] = {
+                'overall_score': self.report['overall_score'],
+                'responses_processed': self.report['responses_processed'],
+                'detailed_metrics': self.report['detailed_metrics'],
+                'skipped': self.report['skipped'],
+                'llm_analysis': self.report['llm_analysis'],
+                'text': EvaluationReportFormatter.format_report(self.report)
+            }
+            body['results'] = {
+                category: [{'question': r.query, 'passing': r.passing, 'feedback': r.feedback,
+                            'error': r.response_text == "ERROR"} for r in results]
+                for category, results in self.results.items()
+            }
+        return body
+
+
+class EvaluationService:
+    """Runs submissions on one background event loop with shared, warm evaluators."""
+    def __init__(
+        self,
+        evaluators: dict[str, BinaryEvaluator],
+        results_store_path: str = "evaluation_results.db",
+        concurrency: int = 20,
+        default_budget: EvaluationBudget | None = None,
+        responses_dir: str | None = None,
+    ):
+        self.evaluators: dict[str, BinaryEvaluator] = evaluators
+        self.responses_dir: str | None = os.path.realpath(responses_dir) if responses_dir is not None else None
+        self.results_store_path: str = results_store_path
+        self.results_store: ResultsStore | None = None
+        self.scheduler: EvaluationScheduler = EvaluationScheduler(default_budget or EvaluationBudget(), concurrency=concurrency)
+        self.llm: OpenAI = OpenAI()
+        self.questions, self.correct_answers = load_golden_dataset()
+        self._reference_answers: dict[str, tuple[str, str]] = {
+            normalize_question(q): (q, a) for q, a in zip(self.questions, self.correct_answers)
+        }
+        self.submissions: dict[str, Submission] = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        # sqlite connections may only be used by the thread that opened them
+        self.results_store = ResultsStore(self.results_store_path)
+        self.scheduler.history = EvaluationHistory.from_store(self.results_store)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def submit_file(self, version: int, responses_file: str, description: str = "", model: str = "gpt-4o",
+                    limit: int | None = None, budget: EvaluationBudget | None = None) -> Submission:
+        """Submit a pickled responses file from the service's responses_dir."""
+        if self.responses_dir is None:
+            raise ValueError("responses_file is disabled; start the service with a responses_dir")
+        path = os.path.realpath(os.path.join(self.responses_dir, responses_file))
+        if os.path.commonpath([self.responses_dir, path]) != self.responses_dir:
+            raise ValueError(f"responses_file must be inside {self.responses_dir}")
+        responses = load_responses(path)[:limit]
+        return self._submit(version, description, model, self.questions[:len(responses)],
+                            self.correct_answers[:len(responses)], responses, budget)
+
+    def submit_items(self, version: int, items: list[dict[str, Any]], description: str = "", model: str = "gpt-4o",
+                     limit: int | None = None, budget: EvaluationBudget | None = None) -> Submission:
+        """Submit {"question", "response", "contexts"} items; questions must be in the golden dataset."""
+        questions, answers, responses = [], [], []
+        for item in items[:limit]:
+            reference = self._reference_answers.get(normalize_question(item.get('question', '')))
+            if reference is None:
+                raise ValueError(f"Question not in the golden dataset: {item.get('question')!r}")
+            questions.append(reference[0])
+            answers.append(reference[1])
+            source_nodes = [NodeWithScore(node=TextNode(text=context)) for context in item.get('contexts', [])]
+            responses.append(Response(item.get('response', ''), source_nodes))
+        return self._submit(version, description, model, questions, answers, responses, budget)
+
+    def _submit(self, version: int, description: str, model: str, questions: list[str], answers: list[str],
+                responses: list[Response], budget: EvaluationBudget | None) -> Submission:
+        if not responses:
+            raise ValueError("Nothing to evaluate")
+        submission = Submission(uuid.uuid4().hex[:12], version, description, model, questions, answers, responses, budget)
+        with self._lock:
+            self.submissions[submission.submission_id] = submission
+        asyncio.run_coroutine_threadsafe(self._evaluate(submission), self._loop)
+        return submission
+
+    async def _evaluate(self, submission: Submission):
+        submission.status = "running"
+        pipeline = ResponseEvaluationPipeline(
+            llm=self.llm,
+            version=submission.version,
+            description=submission.description,
+            model=submission.model,
+            evaluators=self.evaluators,
+            output_dir=f"evaluation_v{submission.version}_{submission.submission_id}",
+            results_store=self.results_store
+        )
+        try:
+            outcome = await pipeline.evaluate_responses_scheduled(
+                submission.responses, submission.questions, submission.answers, self.scheduler,
+                limit=len(submission.responses), budget=submission.budget)
+            for category, results in outcome.results.items():
+                self.scheduler.history.add(category, results)
+            skipped = {category: [submission.questions[i] for i in indices] for category, indices in outcome.skipped.items()}
+            responses_processed = len({i for indices in outcome.evaluated.values() for i in indices})
+            # The report's analysis call is synchronous, so keep it off the event loop
+            submission.report = await self._loop.run_in_executor(
+                None, self._write_report, pipeline, outcome.results, responses_processed, skipped)
+            submission.results = outcome.results
+            submission.status = "done"
+        except Exception as e:
+            print(f"ERROR: submission {submission.submission_id} failed: {e}")
+            submission.status = "failed"
+            submission.error = str(e)
+        finally:
+            submission.finished_at = time.time()
+            submission.responses = []
+            submission.done.set()
+
+    @staticmethod
+    def _write_report(pipeline: ResponseEvaluationPipeline, eval_results: dict[str, list[EvaluationResult]],
+                      responses_processed: int, skipped: dict[str, list[str]]) -> dict[str, Any]:
+        report = pipeline.generate_report(eval_results, responses_processed=responses_processed, skipped=skipped)
+        pipeline.save_report(report)
+        return report
+
+
+class EvaluationServer(ThreadingHTTPServer):
+    def __init__(self, service: EvaluationService, port: int = 8002):
+        super().__init__(('127.0.0.1', port), _EvaluationHandler)
+        self.service: EvaluationService = service
+
+
+_JSON_TYPES = {'application/json'}
+_NDJSON_TYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+
+
+class _EvaluationHandler(BaseHTTPRequestHandler):
+    server: EvaluationServer
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, body: Any, status: int = 200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self) -> bytes:
+        if self.headers.get('Transfer-Encoding', '').lower() != 'chunked':
+            return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        chunks: list[bytes] = []
+        while size := int(self.rfile.readline().split(b';')[0], 16):
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        # Skip any trailers up to the blank line that ends the body
+        while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+            pass
+        return b''.join(chunks)
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip('/')
+        service = self.server.service
+        if path == '/health':
+            statuses = [submission.status for submission in list(service.submissions.values())]
+            self._send_json({
+                'golden_questions': len(service.questions),
+                'evaluators': list(service.evaluators),
+                'queued': statuses.count("queued"),
+                'running': statuses.count("running")
+            })
+        elif path == '/evaluations':
+            self._send_json([{k: v for k, v in submission.to_json().items() if k not in ('report', 'results')}
+                             for submission in list(service.submissions.values())])
+        elif path.startswith('/evaluations/') and path[len('/evaluations/'):] in service.submissions:
+            self._send_json(service.submissions[path[len('/evaluations/'):]].to_json())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip('/') != '/evaluations':
+            self.send_error(404)
+            return
+        params: dict[str, Any] = dict(parse_qsl(url.query))
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        try:
+            body = self._read_body().decode()
+            if body.strip() and content_type not in _JSON_TYPES | _NDJSON_TYPES:
+                self._send_json({'error': f"Unsupported Content-Type {content_type!r}; "
+                                          f"send application/json or application/x-ndjson"}, status=415)
+                return
+            if content_type in _NDJSON_TYPES:
+                params['responses'] = [json.loads(line) for line in body.splitlines() if line.strip()]
+            elif body.strip():
+                params.update(json.loads(body))
+            if 'version' not in params:
+                raise ValueError("version is required")
+            arguments: dict[str, Any] = {
+                'version': int(params['version']),
+                'description': params.get('description', ""),
+                'model': params.get('model', "gpt-4o"),
+                'limit': int(params['limit']) if 'limit' in params else None,
+                'budget': EvaluationBudget(**params['budget']) if isinstance(params.get('budget'), dict) else None
+            }
+            if 'responses_file' in params:
+                submission = self.server.service.submit_file(responses_file=params['responses_file'], **arguments)
+            elif 'responses' in params:
+                submission = self.server.service.submit_items(items=params['responses'], **arguments)
+            else:
+                raise ValueError("Either responses_file or responses is required")
+        except (ValueError, TypeError, OSError) as e:
+            self._send_json({'error': str(e)}, status=400)
+            return
+
+        if str(params.get('wait', '')).lower() in ('1', 'true', 'yes'):
+            submission.done.wait()
+            self._send_json(submission.to_json())
+        else:
+            self._send_json(submission.to_json(), status=202)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8002
+    evaluators: dict[str, BinaryEvaluator] = {
+        'correctness': CorrectnessEvaluator(),
+        'faithfulness': FaithfulnessEvaluator(),
+        'relevancy': RelevancyEvaluator(),
+        'guideline_compliance': GuidelineComplianceEvaluator(),
+    }
+    service = EvaluationService(evaluators, responses_dir=sys.argv[2] if len(sys.argv) > 2 else None)
+    service.start()
+    print(f"Evaluation service listening on http://127.0.0.1:{port}")
+    EvaluationServer(service, port).serve_forever()
@@ -4,7 +4,14 @@ from llama_index.core.prompts import (
 from llama_index.core.bridge.pydantic import BaseModel, Field
 
 # --- CORRECTNESS ---
-CORRECTNESS_EVALUATION_TEMPLATE = '''
+# Static instructions and examples go in the system message and per-item fields
+# in the user message, so the prefix is byte-identical across calls and can be
+# served from the provider's prompt cache. OpenAI only caches prefixes of 1024
+# tokens or more, which only the verbose correctness prompt (~1150) reaches; the
+# terse, fused and guideline prefixes (~120-420) are not cached there, and
+# padding them up to the threshold would cost more than the cache discount
+# saves. Self-hosted servers with prefix caching reuse them at any length.
+CORRECTNESS_EVALUATION_SYSTEM_PROMPT = '''
     You are an expert evaluation system for a question-answering chatbot. Your task is to judge the correctness of generated answers by comparing them to reference answers, considering the original user query.
 
     You will be provided with the following information:
@@ -115,8 +122,9 @@ CORRECTNESS_EVALUATION_TEMPLATE = '''
     </ideal_output>
     </example>
     </examples>
+    '''
 
-
+CORRECTNESS_EVALUATION_ITEM_TEMPLATE = '''
     Now, please proceed with your analysis and evaluation of the provided query and answers.
     <user_query>
     {query}
@@ -133,6 +141,31 @@ CORRECTNESS_EVALUATION_TEMPLATE = '''
     <analysis>
     '''
 
+CORRECTNESS_TERSE_EVALUATION_SYSTEM_PROMPT = '''
+    You are an expert evaluation system for a question-answering chatbot. Your task is to judge the correctness of a generated answer by comparing it to a reference answer, considering the original user query.
+
+    - PASS: The important parts of the response are consistent with the reference answer and adequately address the user query.
+    - FAIL: The answer is partially or fundamentally wrong, it may be missing key points or contains major inaccuracies, or fails to address the user query.
+
+    Focus on the important parts of the response being consistent with the reference answer, rather than requiring exact matches.
+    Do not write out your analysis. Set passing to true for PASS and false for FAIL, score how correct the answer is from 1 to 5,
+    and keep feedback to one short sentence naming the main reason for the verdict.
+    '''
+
+CORRECTNESS_TERSE_EVALUATION_ITEM_TEMPLATE = '''
+    <user_query>
+    {query}
+    </user_query>
+
+    <reference_answer>
+    {reference_answer}
+    </reference_answer>
+
+    <generated_answer>
+    {generated_answer}
+    </generated_answer>
+    '''
+
 # --- FAITHFULNESS ---
 
 FAITHFULNESS_EVALUATION_TEMPLATE = PromptTemplate(
@@ -229,7 +262,8 @@ GENERAL_GUIDELINES = [(
 )]
 
 
-GUIDELINES_EVALUATION_TEMPLATE = '''
+# The guideline is part of the shared prefix, so calls for the same guideline hit the cache
+GUIDELINES_EVALUATION_SYSTEM_TEMPLATE = '''
     You are an expert evaluation system for a question-answering chatbot. Your task is to judge if the generated answer follows the guidelines given.
 
     You will be provided with the following information:
@@ -265,7 +299,13 @@ GUIDELINES_EVALUATION_TEMPLATE = '''
     Feedback: [Detailed explanation of your evaluation, highlighting strengths and weaknesses of the generated answer]
     </evaluation>
 
-     Now, please proceed with your analysis and evaluation of the provided query and answers.
+    <guidelines>
+    {guidelines}
+    </guidelines>
+    '''
+
+GUIDELINES_EVALUATION_ITEM_TEMPLATE = '''
+    Now, please proceed with your analysis and evaluation of the provided query and answers.
     <user_query>
     {query}
     </user_query>
@@ -273,15 +313,35 @@ GUIDELINES_EVALUATION_TEMPLATE = '''
     <generated_answer>
     {generated_answer}
     </generated_answer>
-    
+
+    <analysis>
+'''
+
+GUIDELINES_TERSE_EVALUATION_SYSTEM_TEMPLATE = '''
+    You are an expert evaluation system for a question-answering chatbot. Your task is to judge if the generated answer follows the guidelines given.
+
+    - PASS: The generated answer adheres to the guidelines.
+    - FAIL: The generated answer does not adhere to the guidelines.
+
+    Do not write out your analysis. Set passing to true for PASS and false for FAIL, score how well the guidelines were followed from 1 to 5,
+    and keep feedback to one short sentence naming the main reason for the verdict.
+
     <guidelines>
     {guidelines}
     </guidelines>
+    '''
 
-    <analysis>
-'''
+GUIDELINES_TERSE_EVALUATION_ITEM_TEMPLATE = '''
+    <user_query>
+    {query}
+    </user_query>
 
-GUIDELINES_CHOOSING_TEMPLATE = '''
+    <generated_answer>
+    {generated_answer}
+    </generated_answer>
+    '''
+
+GUIDELINES_CHOOSING_SYSTEM_TEMPLATE = '''
     You are an expert in decision making. 
     Your task is to determine if these guidelines are relevant and pertain to the given query and generated answer.
     You will be provided with the following information:
@@ -322,6 +382,12 @@ GUIDELINES_CHOOSING_TEMPLATE = '''
     Relevant: [YES/NO]
     </evaluation>
 
+    <guidelines>
+    {guidelines}
+    </guidelines>
+    '''
+
+GUIDELINES_CHOOSING_ITEM_TEMPLATE = '''
     Now, please proceed with your analysis and evaluation of the provided query and answers.
     <user_query>
     {query}
@@ -331,10 +397,67 @@ GUIDELINES_CHOOSING_TEMPLATE = '''
     {generated_answer}
     </generated_answer>
     
+    <analysis>
+
+    '''
+
+# --- FUSED ---
+
+class CriterionVerdict(BaseModel):
+    criterion: str = Field(description='The name of the criterion being judged.')
+    passing: bool = Field(description='Whether the response passes the criterion.')
+    feedback: str = Field(description='One short sentence naming the main reason for the verdict.')
+
+class FusedEvaluationData(BaseModel):
+    verdicts: list[CriterionVerdict] = Field(description='One verdict for every criterion that was asked for.')
+
+FUSED_CRITERIA = {
+    'correctness': (
+        "PASS if the important parts of the generated answer are consistent with the reference answer and adequately address the user query. "
+        "FAIL if it is partially or fundamentally wrong, misses key points, contains major inaccuracies, or fails to address the user query."
+    ),
+    'faithfulness': (
+        "PASS if the information in the generated answer is supported by the contexts, even if most of the contexts are unrelated. "
+        "FAIL if the contexts do not support the information."
+    ),
+    'relevancy': (
+        "PASS if the generated answer for the user query is in line with the context information. "
+        "FAIL otherwise."
+    ),
+    'guideline_compliance': (
+        "First decide which of the guidelines pertain to the user query and generated answer. "
+        "PASS if the generated answer adheres to every guideline that pertains to it. "
+        "FAIL if it breaks any of them."
+    ),
+}
+
+FUSED_EVALUATION_SYSTEM_TEMPLATE = '''
+    You are an expert evaluation system for a question-answering chatbot. Your task is to judge a generated answer against several criteria at once.
+
+    Judge each of the following criteria independently and return exactly one verdict per criterion, using the criterion name as given:
+    {criteria}
+
+    Do not write out your analysis. Keep each feedback to one short sentence naming the main reason for the verdict.
+
     <guidelines>
     {guidelines}
     </guidelines>
-    
-    <analysis>
+    '''
+
+FUSED_EVALUATION_ITEM_TEMPLATE = '''
+    <user_query>
+    {query}
+    </user_query>
 
-    '''
\ No newline at end of file
+    <reference_answer>
+    {reference_answer}
+    </reference_answer>
+
+    <generated_answer>
+    {generated_answer}
+    </generated_answer>
+
+    <contexts>
+    {contexts}
+    </contexts>
+    '''
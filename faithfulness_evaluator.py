@@ -1,15 +1,41 @@
 from typing_extensions import override
-from binary_evaluator import BinaryEvaluator
+from evaluation.binary_evaluator import BinaryEvaluator
+from llama_index.core import Settings
+from llama_index.core.llms import LLM
+from llama_index.core.evaluation.faithfulness import DEFAULT_EVAL_TEMPLATE, DEFAULT_REFINE_TEMPLATE, TEMPLATES_CATALOG
 from llama_index.core.evaluation.faithfulness import FaithfulnessEvaluator as LlamaIndexFaithfulnessEvaluator
-from evaluation_result import EvaluationResult
+from llama_index.llms.openai import OpenAI as LlamaIndexOpenAI
+from evaluation.evaluation_plan import PlannedCall
+from evaluation.evaluation_result import EvaluationResult
 from llama_index.core.evaluation.base import EvaluationResult as LlamaIndexEvaluationResult
+from evaluation.tracing import tracer
 class FaithfulnessEvaluator(BinaryEvaluator):
-    def __init__(self) -> None:
-        super().__init__()
+    """Judges through LlamaIndex, so it takes a LlamaIndex LLM rather than a JudgeBackend.
+
+    Pass `judge_llm` (e.g. an OpenAILike pointed at a self-hosted server) to
+    judge elsewhere; without it or a model the judge is Settings.llm.
+    """
+    def __init__(self, model: str | None = None, judge_llm: LLM | None = None) -> None:
+        super().__init__(model or "")
+        self.judge_llm: LLM | None = judge_llm or (LlamaIndexOpenAI(model=model) if model else None)
+    def _judge_model(self) -> str:
+        return (self.judge_llm or Settings.llm).metadata.model_name
+    @override
+    def _plan(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> list[PlannedCall]:
+        model = self._judge_model()
+        contexts = contexts or [""]
+        eval_template = TEMPLATES_CATALOG.get(model, DEFAULT_EVAL_TEMPLATE)
+        # The refine chain makes at most one call per context
+        planned_calls: list[PlannedCall] = [PlannedCall(kind="faithfulness", model=model, prompt=eval_template.format(query_str=response_text, context_str=contexts[0]), expected_output_tokens=5)]
+        for context in contexts[1:]:
+            prompt = DEFAULT_REFINE_TEMPLATE.format(query_str=response_text, existing_answer="YES", context_msg=context)
+            planned_calls.append(PlannedCall(kind="faithfulness_refine", model=model, prompt=prompt, expected_output_tokens=5, upper_bound=True))
+        return planned_calls
     @override
     async def _evaluate(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> EvaluationResult:
         if response_text is None or question is None or contexts is None:
             raise ValueError("Question, contexts, response_text, must be provided for faithfulness evaluation")
-        evaluator = LlamaIndexFaithfulnessEvaluator()
-        evaluation_result: LlamaIndexEvaluationResult = await evaluator.aevaluate(query=question, response=response_text, contexts=contexts)
+        evaluator = LlamaIndexFaithfulnessEvaluator(llm=self.judge_llm)
+        with tracer.span('llamaindex_refine', model=self._judge_model()):
+            evaluation_result: LlamaIndexEvaluationResult = await evaluator.aevaluate(query=question, response=response_text, contexts=contexts)
         return EvaluationResult(query=question, contexts=contexts, response_text=response_text, passing=evaluation_result.passing or False, feedback=evaluation_result.feedback or "")
@@ -0,0 +1,144 @@
+import asyncio
+from contextvars import ContextVar
+
+from typing_extensions import override
+
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.evaluation_plan import PlannedCall
+from evaluation.evaluation_result import EvaluationResult, UsageStats
+from evaluation.evaluation_templates import (
+    FUSED_CRITERIA,
+    FUSED_EVALUATION_ITEM_TEMPLATE,
+    FUSED_EVALUATION_SYSTEM_TEMPLATE,
+    GENERAL_GUIDELINES,
+    GULAQ_GUIDELINES,
+    CriterionVerdict,
+    FusedEvaluationData,
+)
+from evaluation.judge_backend import JudgeBackend, OpenAIChatBackend
+from evaluation.tracing import tracer
+
+_VerdictMemo = dict[tuple[str, str, str, tuple[str, ...]], asyncio.Task[dict[str, CriterionVerdict]]]
+
+# Each run's verdict memo per FusedEvaluator, set by start_run in the run's task
+# and inherited by the tasks it starts, so concurrent runs never touch each other's
+_run_verdicts: ContextVar[dict["FusedEvaluator", _VerdictMemo] | None] = ContextVar('fused_run_verdicts', default=None)
+
+
+class FusedEvaluator:
+    """Judges several categories of the same response in a single structured call.
+
+    Use `category` to get a BinaryEvaluator per fused category, so fused and
+    separate evaluators can be mixed in the evaluators passed to
+    ResponseEvaluationPipeline. Whichever fused category runs first makes the
+    call; the others in the same run reuse its verdicts.
+    """
+    def __init__(self, categories: list[str], model: str = "gpt-4o", backend: JudgeBackend | None = None) -> None:
+        unknown = [category for category in categories if category not in FUSED_CRITERIA]
+        if unknown:
+            raise ValueError(f"Categories {unknown} cannot be fused. Supported: {list(FUSED_CRITERIA)}")
+        self.backend: JudgeBackend = backend or OpenAIChatBackend()
+        self.categories: list[str] = categories
+        self.model: str = model
+        self.usage: UsageStats = UsageStats()
+        criteria = "\n    ".join(f"- {category}: {FUSED_CRITERIA[category]}" for category in self.categories)
+        self.system_prompt: str = FUSED_EVALUATION_SYSTEM_TEMPLATE.format(
+            criteria=criteria,
+            guidelines="\n".join(GENERAL_GUIDELINES + GULAQ_GUIDELINES)
+        )
+        # Used outside a run, e.g. by the benchmark
+        self._verdicts: _VerdictMemo = {}
+
+    def category(self, category: str) -> "FusedCategoryEvaluator":
+        if category not in self.categories:
+            raise ValueError(f"{category} is not one of the fused categories {self.categories}")
+        return FusedCategoryEvaluator(self, category)
+
+    def start_run(self) -> None:
+        """Give the current run a fresh verdict memo, leaving those of runs still in flight alone."""
+        _run_verdicts.set({**(_run_verdicts.get() or {}), self: {}})
+
+    def _memo(self) -> _VerdictMemo:
+        scope = _run_verdicts.get()
+        return scope[self] if scope is not None and self in scope else self._verdicts
+
+    def forget_verdicts(self) -> None:
+        self._verdicts.clear()
+
+    def clear(self) -> None:
+        self.forget_verdicts()
+        self.usage.reset()
+
+    def render_item(self, response_text: str, question: str, answer: str, contexts: list[str]) -> str:
+        return FUSED_EVALUATION_ITEM_TEMPLATE.format(
+            query=question,
+            reference_answer=answer,
+            generated_answer=response_text,
+            contexts="\n\n".join(contexts)
+        )
+
+    async def _judge(self, response_text: str, question: str, answer: str, contexts: list[str]) -> dict[str, CriterionVerdict]:
+        with tracer.span('judge_call', model=self.model, fused_categories=len(self.categories)):
+            completion = await self.backend.complete(
+                self.model,
+                [
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": self.render_item(response_text, question, answer, contexts)}
+                ],
+                temperature=0.0,
+                response_format=FusedEvaluationData
+            )
+        self.usage.record(completion)
+        with tracer.span('parse'):
+            evaluation_data = FusedEvaluationData.model_validate_json(completion.content)
+        verdicts = {verdict.criterion: verdict for verdict in evaluation_data.verdicts}
+        missing = [category for category in self.categories if category not in verdicts]
+        if missing:
+            raise ValueError(f"No verdict returned for {missing}")
+        return verdicts
+
+    @staticmethod
+    def _forget_failure(memo: _VerdictMemo, key: tuple[str, str, str, tuple[str, ...]],
+                        task: asyncio.Task[dict[str, CriterionVerdict]]):
+        # A failed call is retried by the next caller instead of being remembered as an error
+        if (task.cancelled() or task.exception() is not None) and memo.get(key) is task:
+            del memo[key]
+
+    async def judge(self, response_text: str, question: str, answer: str, contexts: list[str]) -> dict[str, CriterionVerdict]:
+        memo = self._memo()
+        key = (question, answer, response_text, tuple(contexts))
+        if key not in memo:
+            task = asyncio.ensure_future(self._judge(response_text, question, answer, contexts))
+            task.add_done_callback(lambda task: self._forget_failure(memo, key, task))
+            memo[key] = task
+        return await memo[key]
+
+
+class FusedCategoryEvaluator(BinaryEvaluator):
+    def __init__(self, fused_evaluator: FusedEvaluator, category: str) -> None:
+        super().__init__(fused_evaluator.model)
+        self.fused_evaluator: FusedEvaluator = fused_evaluator
+        self.category: str = category
+        # The shared call's usage is reported under the first fused category; reports
+        # take it from the run's usage scope, so the order categories run in does not matter
+        if category == fused_evaluator.categories[0]:
+            self.usage = fused_evaluator.usage
+
+    @override
+    def start_run(self) -> None:
+        self.fused_evaluator.start_run()
+
+    @override
+    def _plan(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> list[PlannedCall]:
+        # Only the first fused category is charged for the shared call
+        if self.category != self.fused_evaluator.categories[0]:
+            return []
+        prompt = self.fused_evaluator.system_prompt + self.fused_evaluator.render_item(response_text or "", question or "", answer or "", contexts or [])
+        return [PlannedCall(kind="fused", model=self.model, prompt=prompt, expected_output_tokens=40 * len(self.fused_evaluator.categories))]
+
+    @override
+    async def _evaluate(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> EvaluationResult:
+        if response_text is None or question is None or answer is None or contexts is None:
+            raise ValueError("Question, answer, contexts and response_text must be provided for fused evaluation")
+        verdict: CriterionVerdict = (await self.fused_evaluator.judge(response_text, question, answer, contexts))[self.category]
+        return EvaluationResult(query=question, contexts=contexts, response_text=response_text, passing=verdict.passing, feedback=verdict.feedback)
@@ -1,10 +1,29 @@
+import asyncio
+from collections.abc import Callable
 from typing_extensions import override
-from binary_evaluator import BinaryEvaluator
-from evaluation_result import EvaluationResult
-from evaluation_templates import GENERAL_GUIDELINES, GUIDELINES_CHOOSING_TEMPLATE, GUIDELINES_EVALUATION_TEMPLATE, GULAQ_GUIDELINES
+from llama_index.core.base.response.schema import Response
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.evaluation_plan import PlannedCall
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_templates import (
+    GENERAL_GUIDELINES,
+    GUIDELINES_CHOOSING_ITEM_TEMPLATE,
+    GUIDELINES_CHOOSING_SYSTEM_TEMPLATE,
+    GUIDELINES_EVALUATION_ITEM_TEMPLATE,
+    GUIDELINES_EVALUATION_SYSTEM_TEMPLATE,
+    GUIDELINES_TERSE_EVALUATION_ITEM_TEMPLATE,
+    GUIDELINES_TERSE_EVALUATION_SYSTEM_TEMPLATE,
+    GULAQ_GUIDELINES,
+)
+from evaluation.judge_backend import JudgeBackend
+from evaluation.tracing import trace_tags, tracer
 class GuidelineComplianceEvaluator(BinaryEvaluator):
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, model: str = "gpt-4o", terse: bool = False, explain_failures: bool = False,
+                 backend: JudgeBackend | None = None, group_by_guideline: bool = False) -> None:
+        super().__init__(model, terse, explain_failures, backend)
+        # Only worth it on a backend that caches short prefixes, e.g. a self-hosted
+        # server; OpenAI does not cache these (see evaluation_templates)
+        self.group_by_guideline: bool = group_by_guideline
         
     def _extract_relevancy(self, response: str) -> bool:
         if "Relevant:" in response:
@@ -15,27 +34,72 @@ class GuidelineComplianceEvaluator(BinaryEvaluator):
                 return False
         else:
             return False
+
+    async def _is_relevant(self, question: str, response_text: str, guideline: str) -> bool:
+        messages = self._render_messages(
+            GUIDELINES_CHOOSING_SYSTEM_TEMPLATE.format(guidelines=guideline),
+            GUIDELINES_CHOOSING_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+        )
+        content: str = await self._complete(messages, temperature=0.1)
+        with tracer.span('parse'):
+            return self._extract_relevancy(content)
         
     async def _get_relevant_guidelines(self, question: str, response_text: str) -> list[str]:
         # Create a new list with a copy of GENERAL_GUIDELINES
         relevant_guidelines: list[str] = GENERAL_GUIDELINES.copy()
         
         for guideline in GULAQ_GUIDELINES:
-            prompt = GUIDELINES_CHOOSING_TEMPLATE.format(query=question, generated_answer=response_text, guidelines=guideline)
-            completion = await self.llm.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "user", "content":prompt}
-                    ],  
-                temperature=0.1
-            )
-            if completion.choices[0].message.content is None:
-                raise ValueError("No response from the model")
-            relevant: bool = self._extract_relevancy(completion.choices[0].message.content)
+            relevant: bool = await self._is_relevant(question, response_text, guideline)
             if not relevant:
                 continue
             relevant_guidelines.append(guideline)
         return relevant_guidelines
+
+    @override
+    def _plan(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> list[PlannedCall]:
+        planned_calls: list[PlannedCall] = []
+        for guideline in GULAQ_GUIDELINES:
+            prompt = GUIDELINES_CHOOSING_SYSTEM_TEMPLATE.format(guidelines=guideline) + GUIDELINES_CHOOSING_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+            planned_calls.append(PlannedCall(kind="guideline_choosing", model=self.model, prompt=prompt, expected_output_tokens=200))
+        # Relevance is only known after the choosing calls, so assume every guideline applies
+        for guideline in GENERAL_GUIDELINES + GULAQ_GUIDELINES:
+            upper_bound: bool = guideline not in GENERAL_GUIDELINES
+            if self.terse:
+                prompt = GUIDELINES_TERSE_EVALUATION_SYSTEM_TEMPLATE.format(guidelines=guideline) + GUIDELINES_TERSE_EVALUATION_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+                planned_calls.append(PlannedCall(kind="guideline_evaluation", model=self.model, prompt=prompt, expected_output_tokens=60,
+                                                 upper_bound=upper_bound))
+                if not self.explain_failures:
+                    continue
+            prompt = GUIDELINES_EVALUATION_SYSTEM_TEMPLATE.format(guidelines=guideline) + GUIDELINES_EVALUATION_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+            planned_calls.append(PlannedCall(kind="guideline_explanation" if self.terse else "guideline_evaluation", model=self.model, prompt=prompt,
+                                             expected_output_tokens=350, upper_bound=upper_bound or self.terse))
+        return planned_calls
+
+    async def _evaluate_guideline_verbose(self, question: str, response_text: str, guideline: str) -> tuple[bool, str]:
+        messages = self._render_messages(
+            GUIDELINES_EVALUATION_SYSTEM_TEMPLATE.format(guidelines=guideline),
+            GUIDELINES_EVALUATION_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+        )
+        content: str = await self._complete(messages)
+        with tracer.span('parse'):
+            return self._extract_result(content), self._extract_feedback(content)
+
+    async def _evaluate_guideline_terse(self, question: str, response_text: str, guideline: str) -> tuple[bool, str]:
+        messages = self._render_messages(
+            GUIDELINES_TERSE_EVALUATION_SYSTEM_TEMPLATE.format(guidelines=guideline),
+            GUIDELINES_TERSE_EVALUATION_ITEM_TEMPLATE.format(query=question, generated_answer=response_text)
+        )
+        evaluation_data = await self._judge_structured(messages)
+        if not evaluation_data.passing and self.explain_failures:
+            # Keep the terse verdict; the verbose judge only supplies the explanation
+            _, feedback = await self._evaluate_guideline_verbose(question, response_text, guideline)
+            return evaluation_data.passing, feedback
+        return evaluation_data.passing, evaluation_data.feedback
+
+    async def _evaluate_guideline(self, question: str, response_text: str, guideline: str) -> tuple[bool, str]:
+        if self.terse:
+            return await self._evaluate_guideline_terse(question, response_text, guideline)
+        return await self._evaluate_guideline_verbose(question, response_text, guideline)
             
     @override
     async def _evaluate(self, response_text: str|None = None, question: str|None = None, answer: str|None = None, contexts: list[str]|None = None) -> EvaluationResult:
@@ -45,18 +109,86 @@ class GuidelineComplianceEvaluator(BinaryEvaluator):
         results: list[bool] = []
         feedbacks: list[str] = []
         for guideline in relevant_guidelines:
-            prompt = GUIDELINES_EVALUATION_TEMPLATE.format(query=question, generated_answer=response_text, guidelines=guideline)
-            completion = await self.llm.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "user", "content":prompt}
-                    ],
-                temperature=0.0
-            )
-            if completion.choices[0].message.content is None:
-                raise ValueError("No response from the model")
-            results.append(self._extract_result(completion.choices[0].message.content))
-            feedbacks.append(self._extract_feedback(completion.choices[0].message.content))
+            result, feedback = await self._evaluate_guideline(question, response_text, guideline)
+            results.append(result)
+            feedbacks.append(feedback)
         passing: bool = all(results)
         feedback: str = "\n".join(feedbacks)
         return EvaluationResult(query=question, contexts=contexts, response_text=response_text, passing=passing, feedback=feedback)
+
+    @override
+    async def evaluate_responses(self, questions: list[str], answers: list[str],
+                                 responses: list[Response],
+                                 on_result: Callable[[EvaluationResult], None] | None = None) -> list[EvaluationResult]:
+        """With `group_by_guideline`, evaluate guideline by guideline across all items.
+
+        Every call for a guideline shares the same system prefix, so sending them
+        back to back lets a prefix-caching server reuse it. Each pass waits for its
+        slowest call and no item is done before the last pass, so `on_result` only
+        sees results then. Otherwise items are evaluated one by one as usual.
+        """
+        if not self.group_by_guideline:
+            return await super().evaluate_responses(questions, answers, responses, on_result)
+        self._total_count = len(questions)
+        self._completed_count = 0
+
+        semaphore = asyncio.Semaphore(20)  # Limit concurrent evaluations
+        response_texts: list[str] = [response.response or "" for response in responses[:len(questions)]]
+        relevant_guidelines: list[list[str]] = [GENERAL_GUIDELINES.copy() for _ in questions]
+        verdicts: list[list[tuple[bool, str]]] = [[] for _ in questions]
+        errors: dict[int, Exception] = {}
+
+        async def choose(i: int, guideline: str) -> None:
+            with trace_tags(question_index=i):
+                with tracer.span('semaphore_wait'):
+                    await semaphore.acquire()
+                try:
+                    if await self._is_relevant(questions[i], response_texts[i], guideline):
+                        relevant_guidelines[i].append(guideline)
+                except Exception as e:
+                    print(f'Error evaluating response {i}: {e}')
+                    errors[i] = e
+                finally:
+                    semaphore.release()
+
+        async def judge(i: int, guideline: str) -> None:
+            with trace_tags(question_index=i):
+                with tracer.span('semaphore_wait'):
+                    await semaphore.acquire()
+                try:
+                    verdicts[i].append(await self._evaluate_guideline(questions[i], response_texts[i], guideline))
+                except Exception as e:
+                    print(f'Error evaluating response {i}: {e}')
+                    errors[i] = e
+                finally:
+                    semaphore.release()
+
+        for n, guideline in enumerate(GULAQ_GUIDELINES):
+            with tracer.span('guideline_choosing_pass', guideline_index=n):
+                await asyncio.gather(*(choose(i, guideline) for i in range(len(questions)) if i not in errors))
+
+        all_guidelines: list[str] = GENERAL_GUIDELINES + GULAQ_GUIDELINES
+        for n, guideline in enumerate(all_guidelines, start=1):
+            with tracer.span('guideline_evaluation_pass', guideline_index=n - 1):
+                await asyncio.gather(*(judge(i, guideline) for i in range(len(questions))
+                                       if i not in errors and guideline in relevant_guidelines[i]))
+            print(f"Completed guideline {n} of {len(all_guidelines)}")
+
+        evaluations: list[EvaluationResult] = []
+        for i, question in enumerate(questions):
+            if i in errors:
+                evaluations.append(self._error_result(question, errors[i]))
+                continue
+            contexts: list[str] = [node.__str__() for node in responses[i].source_nodes]
+            evaluations.append(EvaluationResult(
+                query=question,
+                contexts=contexts,
+                response_text=response_texts[i],
+                passing=all(passing for passing, _ in verdicts[i]),
+                feedback="\n".join(feedback for _, feedback in verdicts[i])
+            ))
+        self._completed_count = len(questions)
+        if on_result is not None:
+            for evaluation in evaluations:
+                on_result(evaluation)
+        return evaluations
@@ -0,0 +1,199 @@
+from abc import abstractmethod
+import asyncio
+from dataclasses import dataclass, field
+import json
+import time
+from typing import Any, Callable
+
+from llama_index.core.bridge.pydantic import BaseModel
+from openai import AsyncOpenAI, LengthFinishReasonError
+
+from evaluation.tracing import tracer
+
+
+@dataclass
+class JudgeCompletion:
+    content: str
+    usage: Any | None = None
+    # The model hit max_tokens, so structured content may be cut off mid-JSON
+    truncated: bool = False
+
+
+class JudgeBackend():
+    @abstractmethod
+    async def complete(self, model: str, messages: list[dict[str, str]], temperature: float = 0.0,
+                       max_tokens: int | None = None, response_format: type[BaseModel] | None = None) -> JudgeCompletion:
+        """Return the text of one chat completion, as JSON when response_format is given."""
+        pass
+
+
+class OpenAIChatBackend(JudgeBackend):
+    """One chat completion per prompt, as the evaluators have always done."""
+    def __init__(self, llm: AsyncOpenAI | None = None) -> None:
+        self.llm: AsyncOpenAI = llm or AsyncOpenAI()
+
+    async def complete(self, model: str, messages: list[dict[str, str]], temperature: float = 0.0,
+                       max_tokens: int | None = None, response_format: type[BaseModel] | None = None) -> JudgeCompletion:
+        if response_format is not None:
+            try:
+                completion = await self.llm.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            except LengthFinishReasonError as e:
+                return JudgeCompletion(content=e.completion.choices[0].message.content or "", usage=e.completion.usage, truncated=True)
+        else:
+            completion = await self.llm.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        if completion.choices[0].message.content is None:
+            raise ValueError("No response from the model")
+        return JudgeCompletion(content=completion.choices[0].message.content, usage=completion.usage,
+                               truncated=completion.choices[0].finish_reason == "length")
+
+
+@dataclass
+class _PendingPrompt:
+    messages: list[dict[str, str]]
+    future: asyncio.Future[JudgeCompletion]
+    enqueued_at: float
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    prompts: int = 0
+    max_batch_size: int = 0
+    total_wait_s: float = 0.0
+    total_request_s: float = 0.0
+    batch_sizes: dict[int, int] = field(default_factory=dict)
+
+    def record(self, batch_size: int, wait_s: float, request_s: float):
+        self.batches += 1
+        self.prompts += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.total_wait_s += wait_s
+        self.total_request_s += request_s
+        self.batch_sizes[batch_size] = self.batch_sizes.get(batch_size, 0) + 1
+
+    def format(self) -> str:
+        if not self.batches:
+            return "No batches sent"
+        return (f"{self.prompts} prompts in {self.batches} batches "
+                f"(mean size {self.prompts / self.batches:.1f}, max {self.max_batch_size}); "
+                f"mean queue wait {self.total_wait_s / self.prompts * 1000:.0f}ms, "
+                f"mean request latency {self.total_request_s / self.batches * 1000:.0f}ms")
+
+
+class MicroBatchingBackend(JudgeBackend):
+    """Groups concurrent prompts into micro-batches for a self-hosted OpenAI-compatible server.
+
+    Prompts with the same model and sampling settings that arrive within
+    `batch_window_s` of each other, up to `max_batch_size`, are sent together.
+    By default the batch's chat requests are released together so the server
+    can batch them itself. With `use_completions=True` a batch is one
+    /completions request with a list of prompts, for servers that accept that;
+    /completions does not apply the model's chat template, so pass the model's
+    own as `prompt_formatter` (e.g. a wrapper around the tokenizer's
+    `apply_chat_template(messages, tokenize=False, add_generation_prompt=True)`).
+    """
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "local",
+        batch_window_s: float = 0.01,
+        max_batch_size: int = 32,
+        use_completions: bool = False,
+        prompt_formatter: Callable[[list[dict[str, str]]], str] | None = None,
+    ) -> None:
+        if use_completions and prompt_formatter is None:
+            raise ValueError("use_completions requires the judge model's chat template as prompt_formatter")
+        self.llm: AsyncOpenAI = AsyncOpenAI(base_url=base_url, api_key=api_key)
+        self.batch_window_s: float = batch_window_s
+        self.max_batch_size: int = max_batch_size
+        self.use_completions: bool = use_completions
+        self.prompt_formatter: Callable[[list[dict[str, str]]], str] | None = prompt_formatter
+        self.stats: BatchStats = BatchStats()
+        self._queues: dict[tuple[Any, ...], list[_PendingPrompt]] = {}
+        self._flushers: dict[tuple[Any, ...], asyncio.Task[None]] = {}
+        # The event loop only keeps weak references to tasks
+        self._sends: set[asyncio.Task[None]] = set()
+
+    async def complete(self, model: str, messages: list[dict[str, str]], temperature: float = 0.0,
+                       max_tokens: int | None = None, response_format: type[BaseModel] | None = None) -> JudgeCompletion:
+        key = (model, temperature, max_tokens, response_format)
+        future: asyncio.Future[JudgeCompletion] = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, []).append(_PendingPrompt(messages, future, time.monotonic()))
+        if len(self._queues[key]) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._flushers:
+            self._flushers[key] = asyncio.ensure_future(self._flush_after_window(key))
+        return await future
+
+    async def _flush_after_window(self, key: tuple[Any, ...]):
+        await asyncio.sleep(self.batch_window_s)
+        self._flushers.pop(key, None)
+        self._flush(key)
+
+    def _flush(self, key: tuple[Any, ...]):
+        batch = self._queues.pop(key, [])
+        flusher = self._flushers.pop(key, None)
+        if flusher is not None and flusher is not asyncio.current_task():
+            flusher.cancel()
+        if batch:
+            send = asyncio.ensure_future(self._send(key, batch))
+            self._sends.add(send)
+            send.add_done_callback(self._sends.discard)
+
+    async def _send(self, key: tuple[Any, ...], batch: list[_PendingPrompt]):
+        model, temperature, max_tokens, response_format = key
+        sent_at = time.monotonic()
+        completions: list[JudgeCompletion | BaseException]
+        try:
+            with tracer.span('batch_request', model=model, batch_size=len(batch)):
+                if self.use_completions:
+                    completions = await self._send_completions(model, temperature, max_tokens, response_format, batch)
+                else:
+                    # Separate requests fail separately
+                    completions = await asyncio.gather(*(
+                        OpenAIChatBackend(self.llm).complete(model, pending.messages, temperature, max_tokens, response_format)
+                        for pending in batch
+                    ), return_exceptions=True)
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+        self.stats.record(len(batch), sum(sent_at - pending.enqueued_at for pending in batch), time.monotonic() - sent_at)
+        for pending, completion in zip(batch, completions):
+            if pending.future.done():
+                continue
+            if isinstance(completion, BaseException):
+                pending.future.set_exception(completion)
+            else:
+                pending.future.set_result(completion)
+
+    async def _send_completions(self, model: str, temperature: float, max_tokens: int | None,
+                                response_format: type[BaseModel] | None, batch: list[_PendingPrompt]) -> list[JudgeCompletion]:
+        extra_body: dict[str, Any] = {}
+        if response_format is not None:
+            # Guided decoding keeps batched completions parseable as the requested schema
+            extra_body['guided_json'] = json.dumps(response_format.model_json_schema())
+        completion = await self.llm.completions.create(
+            model=model,
+            prompt=[self.prompt_formatter(pending.messages) for pending in batch],
+            temperature=temperature,
+            max_tokens=max_tokens or 1024,
+            extra_body=extra_body or None
+        )
+        choices = {choice.index: choice for choice in completion.choices}
+        if len(choices) != len(batch):
+            raise ValueError(f"Expected {len(batch)} completions, got {len(choices)}")
+        # Token usage is only reported for the whole batch
+        return [JudgeCompletion(content=choices[i].text, truncated=choices[i].finish_reason == "length") for i in range(len(batch))]
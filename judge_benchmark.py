@@ -0,0 +1,125 @@
+import asyncio
+from dataclasses import dataclass
+import time
+from typing import Any
+
+from llama_index.core.base.response.schema import Response
+
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.fused_evaluator import FusedEvaluator
+
+
+@dataclass
+class EvaluatorComparison:
+    category: str
+    baseline_seconds: float
+    candidate_seconds: float
+    agreement: float
+    disagreements: list[int]
+    baseline_pass_rate: float
+    candidate_pass_rate: float
+
+
+async def _timed_evaluation(evaluator: BinaryEvaluator, questions: list[str], answers: list[str],
+                            responses: list[Response]) -> tuple[list[EvaluationResult], float]:
+    start = time.perf_counter()
+    results = await evaluator.evaluate_responses(questions=questions, answers=answers, responses=responses)
+    return results, time.perf_counter() - start
+
+
+def compare_results(category: str, baseline: list[EvaluationResult], candidate: list[EvaluationResult],
+                    baseline_seconds: float = 0.0, candidate_seconds: float = 0.0) -> EvaluatorComparison:
+    """Compare two sets of verdicts for the same items, skipping items either side errored on."""
+    compared = [i for i in range(len(baseline))
+                if baseline[i].response_text != "ERROR" and candidate[i].response_text != "ERROR"]
+    disagreements = [i for i in compared if baseline[i].passing != candidate[i].passing]
+
+    def pass_rate(results: list[EvaluationResult]) -> float:
+        return sum(1 for i in compared if results[i].passing) / len(compared) if compared else 0.0
+
+    return EvaluatorComparison(
+        category=category,
+        baseline_seconds=baseline_seconds,
+        candidate_seconds=candidate_seconds,
+        agreement=1 - len(disagreements) / len(compared) if compared else 0.0,
+        disagreements=disagreements,
+        baseline_pass_rate=pass_rate(baseline),
+        candidate_pass_rate=pass_rate(candidate)
+    )
+
+
+async def compare_evaluators(category: str, baseline: BinaryEvaluator, candidate: BinaryEvaluator,
+                             questions: list[str], answers: list[str], responses: list[Response]) -> EvaluatorComparison:
+    """Run two evaluators on the same items, one after the other, and compare latency and verdicts."""
+    baseline_results, baseline_seconds = await _timed_evaluation(baseline, questions, answers, responses)
+    candidate_results, candidate_seconds = await _timed_evaluation(candidate, questions, answers, responses)
+    return compare_results(category, baseline_results, candidate_results, baseline_seconds, candidate_seconds)
+
+
+async def compare_fused(fused_evaluator: FusedEvaluator, baselines: dict[str, BinaryEvaluator],
+                        questions: list[str], answers: list[str], responses: list[Response]) -> list[EvaluatorComparison]:
+    """Compare each fused category against its separate evaluator.
+
+    The fused call is shared by all categories, so every comparison reports the
+    same candidate time: the cost of judging all fused categories at once.
+    """
+    fused_evaluator.clear()
+    start = time.perf_counter()
+    fused_results: dict[str, list[EvaluationResult]] = {}
+    for category in fused_evaluator.categories:
+        fused_results[category] = await fused_evaluator.category(category).evaluate_responses(questions=questions, answers=answers, responses=responses)
+    fused_seconds = time.perf_counter() - start
+
+    comparisons: list[EvaluatorComparison] = []
+    for category in fused_evaluator.categories:
+        baseline_results, baseline_seconds = await _timed_evaluation(baselines[category], questions, answers, responses)
+        comparisons.append(compare_results(category, baseline_results, fused_results[category], baseline_seconds, fused_seconds))
+    return comparisons
+
+
+def format_comparisons(comparisons: list[EvaluatorComparison]) -> str:
+    """Format evaluator comparisons as a readable string."""
+    output: list[Any] = []
+    output.append("=== JUDGE BENCHMARK ===")
+    for comparison in comparisons:
+        output.append(f"\n{comparison.category.upper()}")
+        output.append(f"  Baseline: {comparison.baseline_seconds:.1f}s, pass rate {comparison.baseline_pass_rate:.2%}")
+        output.append(f"  Candidate: {comparison.candidate_seconds:.1f}s, pass rate {comparison.candidate_pass_rate:.2%}")
+        output.append(f"  Agreement: {comparison.agreement:.2%}")
+        if comparison.disagreements:
+            output.append(f"  Disagreeing items: {comparison.disagreements}")
+    return "\n".join(output)
+
+
+if __name__ == "__main__":
+    from evaluation.correctness_evaluator import CorrectnessEvaluator
+    from evaluation.evaluation import load_golden_dataset, load_responses
+    from evaluation.faithfulness_evaluator import FaithfulnessEvaluator
+    from evaluation.guideline_compliance_evaluator import GuidelineComplianceEvaluator
+    from evaluation.relevancy_evaluator import RelevancyEvaluator
+
+    limit = 30
+    questions, answers = load_golden_dataset()
+    responses = load_responses("responses_p0_limit_50.pkl")[:limit]
+    questions, answers = questions[:limit], answers[:limit]
+
+    async def benchmark_terse_judging() -> list[EvaluatorComparison]:
+        return [
+            await compare_evaluators('correctness', CorrectnessEvaluator(), CorrectnessEvaluator(terse=True),
+                                     questions, answers, responses),
+            await compare_evaluators('guideline_compliance', GuidelineComplianceEvaluator(), GuidelineComplianceEvaluator(terse=True),
+                                     questions, answers, responses),
+        ]
+
+    async def benchmark_fused_judging() -> list[EvaluatorComparison]:
+        baselines: dict[str, BinaryEvaluator] = {
+            'correctness': CorrectnessEvaluator(),
+            'faithfulness': FaithfulnessEvaluator(),
+            'relevancy': RelevancyEvaluator(),
+            'guideline_compliance': GuidelineComplianceEvaluator(),
+        }
+        return await compare_fused(FusedEvaluator(list(baselines)), baselines, questions, answers, responses)
+
+    print(format_comparisons(asyncio.run(benchmark_terse_judging())))
+    print(format_comparisons(asyncio.run(benchmark_fused_judging())))
@@ -0,0 +1,87 @@
+"""A stand-in for a self-hosted OpenAI-compatible judge server.
+
+Answers every prompt with a fixed PASS verdict after a fixed delay per request,
+and records how many prompts each request carried, so MicroBatchingBackend can
+be exercised without a GPU. Run with `python local_judge_server.py [port]` and
+point the backend at http://127.0.0.1:<port>/v1.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import sys
+import threading
+import time
+from typing import Any
+
+VERDICT_TEXT = "<evaluation>\nResult: PASS\nRelevant: YES\nFeedback: Stand-in verdict.\n</evaluation>"
+VERDICT_JSON = json.dumps({'passing': True, 'score': 5, 'feedback': 'Stand-in verdict.'})
+
+
+class StandInJudgeServer(ThreadingHTTPServer):
+    def __init__(self, port: int = 8001, request_delay_s: float = 0.05):
+        super().__init__(('127.0.0.1', port), _StandInJudgeHandler)
+        self.request_delay_s: float = request_delay_s
+        self.batch_sizes: list[int] = []
+        self._lock = threading.Lock()
+
+    def record_batch(self, size: int):
+        with self._lock:
+            self.batch_sizes.append(size)
+
+
+class _StandInJudgeHandler(BaseHTTPRequestHandler):
+    server: StandInJudgeServer
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, body: dict[str, Any]):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json({'batch_sizes': self.server.batch_sizes})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        structured = 'guided_json' in request or 'response_format' in request
+        text = VERDICT_JSON if structured else VERDICT_TEXT
+        usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        time.sleep(self.server.request_delay_s)
+
+        if self.path.endswith('/completions') and not self.path.endswith('/chat/completions'):
+            prompts = request.get('prompt', [])
+            prompts = prompts if isinstance(prompts, list) else [prompts]
+            self.server.record_batch(len(prompts))
+            self._send_json({
+                'id': 'cmpl-stand-in',
+                'object': 'text_completion',
+                'created': int(time.time()),
+                'model': request.get('model', ''),
+                'choices': [{'index': i, 'text': text, 'finish_reason': 'stop', 'logprobs': None} for i in range(len(prompts))],
+                'usage': usage
+            })
+        elif self.path.endswith('/chat/completions'):
+            self.server.record_batch(1)
+            self._send_json({
+                'id': 'chatcmpl-stand-in',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': request.get('model', ''),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop', 'logprobs': None}],
+                'usage': usage
+            })
+        else:
+            self.send_error(404)
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
+    print(f"Stand-in judge server listening on http://127.0.0.1:{port}/v1")
+    StandInJudgeServer(port).serve_forever()
@@ -0,0 +1,225 @@
+import asyncio
+from collections import defaultdict
+from dataclasses import dataclass
+import datetime
+from pathlib import Path
+from typing import Any
+
+from llama_index.core.base.response.schema import Response
+from openai import OpenAI
+
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import EvaluationRunner, load_golden_dataset
+from evaluation.evaluation_result import EvaluationResult, UsageStats, start_usage_scope
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationHistory, EvaluationScheduler
+from evaluation.faithfulness_evaluator import FaithfulnessEvaluator
+from evaluation.guideline_compliance_evaluator import GuidelineComplianceEvaluator
+from evaluation.judge_backend import BatchStats, MicroBatchingBackend
+from evaluation.relevancy_evaluator import RelevancyEvaluator
+from evaluation.results_store import ResultsStore
+from evaluation.tracing import tracer
+
+
+@dataclass
+class ResponseSet:
+    version: int
+    responses_file: str
+    description: str = ""
+    model: str = "gpt-4o"
+    name: str | None = None
+    # Only used when responses_file is missing and answers are generated
+    retriever_config: dict[str, Any] | None = None
+    use_answer_cache: bool = False
+    pipeline_id: str | None = None
+
+    @property
+    def label(self) -> str:
+        return self.name or f"v{self.version}"
+
+
+class MatrixEvaluationReportFormatter:
+    @staticmethod
+    def format_comparison(reports: dict[str, dict[str, Any]], unique_pairs: int, total_pairs: int,
+                          usage: dict[str, UsageStats] | None = None, batching: dict[str, BatchStats] | None = None) -> str:
+        """Format per-version pass rates side by side, then the judge usage of the whole matrix."""
+        labels = list(reports)
+        categories: list[str] = []
+        for report in reports.values():
+            categories += [c for c in report['detailed_metrics'] if c not in categories]
+        width = max([len("OVERALL SCORE")] + [len(c) for c in categories]) + 2
+
+        output: list[Any] = []
+        output.append("=== VERSION COMPARISON ===\n")
+        output.append("".ljust(width) + "".join(label.rjust(10) for label in labels))
+        for category in categories:
+            row = category.upper().ljust(width)
+            for label in labels:
+                metrics = reports[label]['detailed_metrics'].get(category)
+                row += (f"{metrics['passing_rate']:.2%}" if metrics else "-").rjust(10)
+            output.append(row)
+        output.append("OVERALL SCORE".ljust(width) + "".join(f"{reports[label]['overall_score']:.2f}".rjust(10) for label in labels))
+        output.append(f"\nJudged {unique_pairs} unique (response, question) pairs for {total_pairs} across all versions")
+
+        usage = {category: stats for category, stats in (usage or {}).items() if stats.calls}
+        if usage:
+            output.append("\nPrompt Cache (all versions):")
+            for category, stats in usage.items():
+                output.append(f"{category.upper()}: {stats.calls} calls, {stats.cached_tokens:,} of {stats.prompt_tokens:,} "
+                              f"prompt tokens cached ({stats.cache_hit_rate:.2%})")
+        if batching:
+            output.append("\nJudge Batching (all versions):")
+            for category, stats in batching.items():
+                output.append(f"{category.upper()}: {stats.format()}")
+        return "\n".join(output)
+
+
+class MatrixEvaluationRunner:
+    """Evaluates several response sets as one workload.
+
+    The golden dataset is downloaded once, the evaluators and OpenAI clients are
+    shared, every judge call goes through one scheduler and limiter, and a
+    (question, response, contexts) triple that appears in several response sets
+    is judged only once. Each response set still gets its own report; judge usage
+    is shared, so it is reported once for the whole matrix in the comparison.
+    """
+    def __init__(
+        self,
+        response_sets: list[ResponseSet],
+        evaluators: dict[str, BinaryEvaluator],
+        results_store: ResultsStore | None = None,
+        concurrency: int = 20,
+    ):
+        labels = [response_set.label for response_set in response_sets]
+        if len(set(labels)) != len(labels):
+            raise ValueError(f"Response set labels must be unique, got {labels}")
+        self.response_sets: list[ResponseSet] = response_sets
+        self.evaluators: dict[str, BinaryEvaluator] = evaluators
+        self.results_store: ResultsStore = results_store or ResultsStore()
+        self.concurrency: int = concurrency
+        llm = OpenAI()
+        golden_dataset = load_golden_dataset()
+        self.questions, self.correct_answers = golden_dataset
+        self.runners: dict[str, EvaluationRunner] = {
+            response_set.label: EvaluationRunner(
+                version=response_set.version,
+                description=response_set.description,
+                model=response_set.model,
+                evaluators=evaluators,
+                retriever_config=response_set.retriever_config,
+                use_answer_cache=response_set.use_answer_cache,
+                pipeline_id=response_set.pipeline_id,
+                results_store=self.results_store,
+                llm=llm,
+                golden_dataset=golden_dataset,
+                output_dir=f"evaluation_{response_set.label}"
+            )
+            for response_set in response_sets
+        }
+
+    def _deduplicate(self, responses: dict[str, list[Response]]) -> tuple[list[int], list[Response], dict[str, list[int]]]:
+        """Return the unique (question index, response) pairs and, per label, which pair each question maps to."""
+        unique_keys: dict[tuple[int, str, tuple[str, ...]], int] = {}
+        unique_indices: list[int] = []
+        unique_responses: list[Response] = []
+        mapping: dict[str, list[int]] = {}
+        for label, label_responses in responses.items():
+            mapping[label] = []
+            for i, response in enumerate(label_responses):
+                key = (i, response.response or "", tuple(node.__str__() for node in response.source_nodes))
+                if key not in unique_keys:
+                    unique_keys[key] = len(unique_responses)
+                    unique_indices.append(i)
+                    unique_responses.append(response)
+                mapping[label].append(unique_keys[key])
+        return unique_indices, unique_responses, mapping
+
+    async def run(self, limit: int = 500, budget: EvaluationBudget | None = None) -> dict[str, dict[str, Any]]:
+        responses: dict[str, list[Response]] = {}
+        for response_set in self.response_sets:
+            runner = self.runners[response_set.label]
+            responses[response_set.label] = runner._load_or_generate_responses(response_set.responses_file, limit)[:limit]
+
+        unique_indices, unique_responses, mapping = self._deduplicate(responses)
+        total_pairs = sum(len(label_responses) for label_responses in responses.values())
+        print(f"Evaluating {len(unique_responses)} unique pairs for {total_pairs} (response, question) pairs...")
+
+        scheduler = EvaluationScheduler(budget or EvaluationBudget(), history=EvaluationHistory.from_store(self.results_store),
+                                        concurrency=self.concurrency)
+        pipelines = {label: self.runners[label].pipeline for label in mapping}
+        for pipeline in pipelines.values():
+            pipeline._start_run()
+        # Each pipeline opened a usage scope of its own; collect the shared calls in one
+        usage_scope = start_usage_scope()
+        # A shared verdict is stored under the run of every version it was judged for
+        labels_of: dict[int, list[str]] = defaultdict(list)
+        for label, unique_ids in mapping.items():
+            for u in unique_ids:
+                labels_of[u].append(label)
+
+        def record(category: str, u: int, result: EvaluationResult):
+            for label in labels_of[u]:
+                pipelines[label]._record_result(category, result)
+
+        try:
+            outcome = await scheduler.run(
+                self.evaluators,
+                [self.questions[i] for i in unique_indices],
+                [self.correct_answers[i] for i in unique_indices],
+                unique_responses,
+                on_result=record
+            )
+        finally:
+            for pipeline in pipelines.values():
+                pipeline._flush_results()
+        finished: dict[str, dict[int, EvaluationResult]] = {
+            category: dict(zip(outcome.evaluated[category], results)) for category, results in outcome.results.items()
+        }
+
+        reports: dict[str, dict[str, Any]] = {}
+        for label, unique_ids in mapping.items():
+            pipeline = pipelines[label]
+            eval_results: dict[str, list[EvaluationResult]] = {}
+            skipped: dict[str, list[str]] = {}
+            evaluated_questions: set[int] = set()
+            for category in self.evaluators:
+                eval_results[category] = [finished[category][u] for u in unique_ids if u in finished[category]]
+                skipped[category] = [self.questions[i] for i, u in enumerate(unique_ids) if u not in finished[category]]
+                evaluated_questions |= {i for i, u in enumerate(unique_ids) if u in finished[category]}
+                pipeline._record_results(category, eval_results[category])
+
+            print(f"Generating report for {label}...")
+            with tracer.span('generate_report', label=label):
+                reports[label] = pipeline.generate_report(eval_results, responses_processed=len(evaluated_questions),
+                                                          skipped=skipped, include_usage=False)
+            pipeline.save_report(reports[label])
+
+        usage = {category: usage_scope[id(evaluator.usage)] for category, evaluator in self.evaluators.items()
+                 if id(evaluator.usage) in usage_scope}
+        batching = {category: evaluator.backend.stats for category, evaluator in self.evaluators.items()
+                    if isinstance(getattr(evaluator, 'backend', None), MicroBatchingBackend)}
+        comparison = MatrixEvaluationReportFormatter.format_comparison(reports, len(unique_responses), total_pairs,
+                                                                       usage=usage, batching=batching)
+        output_path = Path(f"evaluation_matrix_{'_'.join(mapping)}.txt")
+        with open(output_path, 'w') as f:
+            f.write(comparison)
+        print(comparison)
+        return reports
+
+
+if __name__ == "__main__":
+    evaluators: dict[str, BinaryEvaluator] = {
+        'correctness': CorrectnessEvaluator(),
+        'faithfulness': FaithfulnessEvaluator(),
+        'relevancy': RelevancyEvaluator(),
+        'guideline_compliance': GuidelineComplianceEvaluator(),
+    }
+    runner = MatrixEvaluationRunner([
+        ResponseSet(version=12, responses_file="responses_p12_limit_50.pkl"),
+        ResponseSet(version=15, responses_file="responses_p15_limit_50.pkl"),
+    ], evaluators=evaluators)
+
+    start_time = datetime.datetime.now()
+    asyncio.run(runner.run(limit=30))
+    end_time = datetime.datetime.now()
+    print(f"Total execution time: {end_time - start_time}")
@@ -0,0 +1,222 @@
+from dataclasses import dataclass
+import datetime
+import glob
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import uuid
+
+from evaluation.answer_cache import normalize_question
+from evaluation.evaluation_result import EvaluationResult
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    description TEXT,
+    model TEXT,
+    started_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id TEXT NOT NULL REFERENCES runs(run_id),
+    version INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    question_id TEXT NOT NULL,
+    question TEXT NOT NULL,
+    passing INTEGER NOT NULL,
+    is_error INTEGER NOT NULL,
+    response_text TEXT,
+    feedback TEXT,
+    PRIMARY KEY (run_id, category, question_id)
+);
+-- Covering indexes, so the aggregate queries below never touch the table rows
+CREATE INDEX IF NOT EXISTS idx_results_version ON results (version, category, question_id, is_error, passing);
+CREATE INDEX IF NOT EXISTS idx_results_question ON results (question_id, category, version, is_error, passing);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id, category, is_error, passing);
+CREATE INDEX IF NOT EXISTS idx_results_verdict ON results (category, passing);
+CREATE TABLE IF NOT EXISTS questions (
+    question_id TEXT PRIMARY KEY,
+    question TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_version ON runs (version, started_at);
+'''
+
+
+def _latest_results(versions: list[int] | None = None, category: str | None = None) -> tuple[str, list[int | str]]:
+    """Query for the results of the most recent run of each version that judged the category.
+
+    A run that recorded nothing for a category (still running, crashed, or all
+    errors) is passed over. The filters go inside the grouping, so only the
+    requested versions and category are scanned.
+    """
+    filters = ''
+    params: list[int | str] = []
+    if versions is not None:
+        filters += f" AND results.version IN ({', '.join('?' * len(versions))})"
+        params += versions
+    if category is not None:
+        filters += ' AND results.category = ?'
+        params.append(category)
+    return f'''
+        SELECT r.* FROM results r
+        JOIN (
+            SELECT results.run_id, results.category, MAX(runs.started_at)
+            FROM results JOIN runs USING (run_id)
+            WHERE results.is_error = 0{filters}
+            GROUP BY results.version, results.category
+        ) latest_runs USING (run_id, category)
+        WHERE r.is_error = 0
+    ''', params
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha1(normalize_question(question).encode()).hexdigest()[:16]
+
+
+@dataclass
+class VerdictRecord:
+    version: int
+    run_id: str
+    category: str
+    question: str
+    passing: bool
+    feedback: str
+
+
+class ResultsStore:
+    """SQLite warehouse of per-question verdicts across versions and runs."""
+    def __init__(self, path: str = "evaluation_results.db"):
+        self.path: str = path
+        self.connection: sqlite3.Connection = sqlite3.connect(path)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def start_run(self, version: int, description: str = "", model: str = "") -> str:
+        run_id = uuid.uuid4().hex
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO runs (run_id, version, description, model, started_at) VALUES (?, ?, ?, ?, ?)',
+                (run_id, version, description, model, datetime.datetime.now().isoformat())
+            )
+        return run_id
+
+    def add_results(self, run_id: str, version: int, category: str, results: list[EvaluationResult]):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO questions VALUES (?, ?)',
+                [(question_id(r.query), r.query) for r in results]
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(run_id, version, category, question_id(r.query), r.query, int(r.passing),
+                  int(r.response_text == "ERROR"), r.response_text, r.feedback) for r in results]
+            )
+
+    def is_empty(self) -> bool:
+        return self.connection.execute('SELECT 1 FROM results LIMIT 1').fetchone() is None
+
+    def import_legacy_results(self, root: str = ".") -> int:
+        """Load the per-category pickles of evaluation_v* directories, one run per directory."""
+        imported = 0
+        for directory in sorted(glob.glob(os.path.join(root, "evaluation_v*"))):
+            match = re.fullmatch(r"evaluation_v(\d+)", os.path.basename(directory))
+            paths = glob.glob(os.path.join(directory, "*_eval_results.pkl"))
+            if match is None or not paths:
+                continue
+            run_id = self.start_run(int(match.group(1)), description=f"imported from {directory}")
+            for path in paths:
+                with open(path, 'rb') as f:
+                    self.add_results(run_id, int(match.group(1)), os.path.basename(path)[:-len("_eval_results.pkl")], pickle.load(f))
+            imported += 1
+        return imported
+
+    def latest_run(self, version: int, category: str | None = None) -> str | None:
+        """The most recent run of a version with verdicts, for `category` when given."""
+        query = '''
+            SELECT runs.run_id FROM runs
+            WHERE runs.version = ? AND EXISTS (
+                SELECT 1 FROM results r WHERE r.run_id = runs.run_id AND r.is_error = 0
+        '''
+        params: list[int | str] = [version]
+        if category is not None:
+            query += ' AND r.category = ?'
+            params.append(category)
+        row = self.connection.execute(query + ') ORDER BY runs.started_at DESC LIMIT 1', params).fetchone()
+        return row[0] if row else None
+
+    def question_history(self, question: str, category: str | None = None) -> list[VerdictRecord]:
+        """Every verdict recorded for a question, oldest version first."""
+        query = '''
+            SELECT r.version, r.run_id, r.category, r.question, r.passing, r.feedback
+            FROM results r JOIN runs USING (run_id)
+            WHERE r.question_id = ? AND r.is_error = 0
+        '''
+        params: list[str] = [question_id(question)]
+        if category is not None:
+            query += ' AND r.category = ?'
+            params.append(category)
+        query += ' ORDER BY r.version, runs.started_at'
+        return [VerdictRecord(version, run_id, category, question, bool(passing), feedback)
+                for version, run_id, category, question, passing, feedback in self.connection.execute(query, params)]
+
+    def regressions(self, from_version: int, to_version: int, category: str | None = None) -> list[tuple[str, str]]:
+        """(category, question) pairs that passed in from_version and fail in to_version.
+
+        Each category compares the latest runs of the two versions that judged it.
+        """
+        latest, params = _latest_results([from_version, to_version], category)
+        return list(self.connection.execute(f'''
+            WITH latest AS ({latest})
+            SELECT new.category, new.question
+            FROM latest old JOIN latest new
+                ON old.question_id = new.question_id AND old.category = new.category
+            WHERE old.version = ? AND new.version = ? AND old.passing = 1 AND new.passing = 0
+            ORDER BY new.category, new.question
+        ''', params + [from_version, to_version]))
+
+    def flaky_verdicts(self, version: int | None = None, category: str | None = None) -> list[tuple[int, str, str, int, int]]:
+        """(version, category, question, passes, fails) where runs of the same version disagree."""
+        query = '''
+            SELECT version, category, question_id, SUM(passing) AS passes, COUNT(*) - SUM(passing) AS fails
+            FROM results WHERE is_error = 0
+        '''
+        params: list[int | str] = []
+        if version is not None:
+            query += ' AND version = ?'
+            params.append(version)
+        if category is not None:
+            query += ' AND category = ?'
+            params.append(category)
+        query += '''
+            GROUP BY version, category, question_id
+            HAVING SUM(passing) > 0 AND SUM(passing) < COUNT(*)
+        '''
+        return list(self.connection.execute(f'''
+            SELECT flaky.version, flaky.category, questions.question, flaky.passes, flaky.fails
+            FROM ({query}) AS flaky JOIN questions USING (question_id)
+            ORDER BY flaky.version, flaky.category
+        ''', params))
+
+    def pass_rates(self, category: str | None = None) -> list[tuple[int, str, float, int]]:
+        """(version, category, pass rate, evaluations) for the latest run of every version that judged the category."""
+        latest, params = _latest_results(category=category)
+        return list(self.connection.execute(f'''
+            WITH latest AS ({latest})
+            SELECT version, category, AVG(passing), COUNT(*) FROM latest
+            GROUP BY version, category ORDER BY version, category
+        ''', params))
+
+    def verdict_counts(self) -> list[tuple[str, str, int, int]]:
+        """(category, question, evaluations, failures) across every run."""
+        return list(self.connection.execute('''
+            SELECT counts.category, questions.question, counts.evaluations, counts.failures
+            FROM (
+                SELECT category, question_id, COUNT(*) AS evaluations, COUNT(*) - SUM(passing) AS failures
+                FROM results WHERE is_error = 0
+                GROUP BY question_id, category
+            ) AS counts JOIN questions USING (question_id)
+        '''))
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules import each other through the `evaluation` package; load this
+# checkout under that name whatever directory it was cloned into
+if 'evaluation' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('evaluation', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules['evaluation'] = package
+    spec.loader.exec_module(package)
+
+# evaluation.py imports the question-answering app for answer generation and
+# sign-in; the tests pass responses and the golden dataset in instead
+try:
+    import backend.question_answering.app.core.supabase_config  # noqa: F401
+except ImportError:
+    for name, attributes in {
+        'backend.question_answering.app.core.supabase_config': {'supabase_client': None},
+        'backend.question_answering.app.services.answer_service.answer_service': {'AnswerService': object},
+        'backend.question_answering.app.services.user_service.sign_in_service': {'SignInService': object},
+    }.items():
+        parts = name.split('.')
+        for i in range(1, len(parts) + 1):
+            sys.modules.setdefault('.'.join(parts[:i]), types.ModuleType('.'.join(parts[:i])))
+        sys.modules[name].__dict__.update(attributes)
+
+# The OpenAI clients refuse to construct without a key; no test reaches the API
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from evaluation import evaluation_templates  # noqa: E402
+
+# The project-specific guidelines are kept out of this tree; the evaluators only need a list
+if not hasattr(evaluation_templates, 'GULAQ_GUIDELINES'):
+    evaluation_templates.GULAQ_GUIDELINES = []
@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Callable
+
+from llama_index.core.base.response.schema import Response
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from evaluation.judge_backend import JudgeBackend, JudgeCompletion
+
+PASS_JSON = '{"passing": true, "score": 5, "feedback": "ok"}'
+FAIL_JSON = '{"passing": false, "score": 1, "feedback": "wrong"}'
+PASS_TEXT = "<evaluation>\nResult: PASS\nFeedback: ok\n</evaluation>"
+
+
+def usage(prompt_tokens: int = 100, completion_tokens: int = 10, cached_tokens: int = 0) -> SimpleNamespace:
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens))
+
+
+class FakeJudgeBackend(JudgeBackend):
+    """Answers every call with `reply(messages, max_tokens, response_format)`, or a passing verdict."""
+    def __init__(self, reply: Callable[..., JudgeCompletion] | None = None, delay_s: float = 0.0) -> None:
+        self.reply = reply
+        self.delay_s: float = delay_s
+        self.calls: list[dict[str, Any]] = []
+
+    async def complete(self, model, messages, temperature=0.0, max_tokens=None, response_format=None) -> JudgeCompletion:
+        self.calls.append({'model': model, 'messages': messages, 'max_tokens': max_tokens, 'response_format': response_format})
+        await asyncio.sleep(self.delay_s)
+        if self.reply is not None:
+            return self.reply(messages, max_tokens, response_format)
+        return JudgeCompletion(content=PASS_JSON if response_format is not None else PASS_TEXT, usage=usage())
+
+
+def make_response(text: str, contexts: list[str] | None = None) -> Response:
+    return Response(text, [NodeWithScore(node=TextNode(text=context, id_=f"node-{i}")) for i, context in enumerate(contexts or [])])
+
+
+class FakeReportLLM:
+    """Stands in for the synchronous OpenAI client the report's analysis uses."""
+    def __init__(self) -> None:
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs: Any) -> SimpleNamespace:
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="analysis"))])
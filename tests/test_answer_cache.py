@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from evaluation.answer_cache import AnswerCache, normalize_question
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import EvaluationRunner
+from fakes import FakeJudgeBackend, FakeReportLLM
+
+
+def test_questions_are_normalized():
+    assert normalize_question("  What is  GULAQ? ") == normalize_question("what is gulaq")
+
+
+def test_cache_round_trips_through_disk(tmp_path):
+    cache = AnswerCache(version=1, retriever_config={'top_k': 5}, cache_dir=str(tmp_path))
+    asyncio.run(cache.put("What is X?", "X is Y", []))
+    cache.save()
+
+    reloaded = AnswerCache(version=1, retriever_config={'top_k': 5}, cache_dir=str(tmp_path))
+    entry = asyncio.run(reloaded.get("what is x"))
+    assert entry is not None and entry.answer == "X is Y"
+
+
+@pytest.mark.parametrize("changed", [
+    {'version': 2},
+    {'retriever_config': {'top_k': 10}},
+    {'pipeline_id': "3f2a9c1"},
+])
+def test_any_fingerprint_change_starts_an_empty_cache(tmp_path, changed):
+    arguments = {'version': 1, 'retriever_config': {'top_k': 5}, 'pipeline_id': "8d41e07", 'cache_dir': str(tmp_path)}
+    cache = AnswerCache(**arguments)
+    asyncio.run(cache.put("What is X?", "X is Y", []))
+    cache.save()
+
+    assert asyncio.run(AnswerCache(**{**arguments, **changed}).get("What is X?")) is None
+
+
+def make_runner(**kwargs) -> EvaluationRunner:
+    return EvaluationRunner(version=1, description="", model="gpt-4o", evaluators={'correctness': CorrectnessEvaluator(backend=FakeJudgeBackend())},
+                            llm=FakeReportLLM(), golden_dataset=(["Q?"], ["A"]), **kwargs)
+
+
+def test_runner_cache_is_opt_in(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert make_runner().answer_cache is None
+
+
+@pytest.mark.parametrize("missing", ['retriever_config', 'pipeline_id'])
+def test_runner_cache_requires_a_retriever_config_and_pipeline_id(tmp_path, monkeypatch, missing):
+    monkeypatch.chdir(tmp_path)
+    arguments = {'retriever_config': {'top_k': 5}, 'pipeline_id': "8d41e07"}
+    del arguments[missing]
+    with pytest.raises(ValueError):
+        make_runner(use_answer_cache=True, **arguments)
+    assert make_runner(use_answer_cache=True, retriever_config={'top_k': 5}, pipeline_id="8d41e07").answer_cache is not None
@@ -0,0 +1,80 @@
+from llama_index.core import Settings
+from llama_index.core.evaluation.faithfulness import DEFAULT_EVAL_TEMPLATE as FAITHFULNESS_TEMPLATE
+from llama_index.core.evaluation.relevancy import DEFAULT_EVAL_TEMPLATE as RELEVANCY_TEMPLATE
+from llama_index.core.llms import MockLLM
+import pytest
+
+from evaluation import evaluation_plan
+from evaluation.binary_evaluator import BinaryEvaluator
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation_plan import EvaluationPlanner, PlannedCall, count_tokens
+from evaluation.faithfulness_evaluator import FaithfulnessEvaluator
+from evaluation.relevancy_evaluator import RelevancyEvaluator
+
+
+@pytest.fixture(autouse=True)
+def clear_encodings():
+    evaluation_plan._encoding.cache_clear()
+    yield
+    evaluation_plan._encoding.cache_clear()
+
+
+def test_count_tokens_falls_back_when_bpe_download_fails(monkeypatch):
+    def offline(model):
+        raise ConnectionError("no network")
+    monkeypatch.setattr(evaluation_plan.tiktoken, "encoding_for_model", offline)
+    assert count_tokens("x" * 40) == 10
+
+
+def test_count_tokens_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(evaluation_plan, "tiktoken", None)
+    assert count_tokens("abcde") == 2
+
+
+def test_estimate_item_charges_input_and_output(monkeypatch):
+    monkeypatch.setattr(evaluation_plan, "tiktoken", None)
+    planner = EvaluationPlanner()
+    tokens, cost, latency = planner.estimate_item([PlannedCall(kind="k", model="gpt-4o", prompt="x" * 4000, expected_output_tokens=100)])
+    assert tokens == 1100
+    assert cost == pytest.approx((1000 * 2.50 + 100 * 10.00) / 1_000_000)
+    assert latency == pytest.approx(0.6 + 100 / 80.0)
+
+
+def test_plan_category_counts_upper_bound_calls(monkeypatch):
+    monkeypatch.setattr(evaluation_plan, "tiktoken", None)
+    calls = [[PlannedCall(kind="a", model="gpt-4o", prompt="p", expected_output_tokens=1),
+              PlannedCall(kind="a", model="gpt-4o", prompt="p", expected_output_tokens=1, upper_bound=True)]]
+    plan = EvaluationPlanner().plan_category("c", calls)
+    assert plan.calls == 2
+    assert plan.estimates["a"].upper_bound_calls == 1
+
+
+def test_default_plan_is_a_conservative_estimate():
+    class UnplannedEvaluator(BinaryEvaluator):
+        async def _evaluate(self, response_text=None, question=None, answer=None, contexts=None):
+            raise AssertionError
+
+    [call] = UnplannedEvaluator()._plan("response", "question", "answer", ["context"])
+    assert call.upper_bound
+    assert "question" in call.prompt and "context" in call.prompt
+
+
+def test_correctness_plan_renders_system_and_item_prompt():
+    [call] = CorrectnessEvaluator()._plan("generated", "the question", "reference", [])
+    assert "the question" in call.prompt and "reference" in call.prompt
+
+
+def test_llamaindex_judges_plan_the_prompts_llamaindex_sends():
+    faithfulness = FaithfulnessEvaluator(model="gpt-4o-mini")._plan("answer", "question", None, ["c1", "c2"])
+    assert faithfulness[0].prompt == FAITHFULNESS_TEMPLATE.format(query_str="answer", context_str="c1")
+    assert faithfulness[0].model == "gpt-4o-mini"
+    assert faithfulness[1].upper_bound
+    relevancy = RelevancyEvaluator(model="gpt-4o-mini")._plan("answer", "question", None, ["c1"])
+    assert relevancy[0].prompt == RELEVANCY_TEMPLATE.format(query_str="Question: question\nResponse: answer", context_str="c1")
+
+
+def test_llamaindex_judges_default_to_settings_llm(monkeypatch):
+    monkeypatch.setattr(Settings, "_llm", MockLLM())
+    evaluator = FaithfulnessEvaluator()
+    assert evaluator.model == ""
+    assert evaluator._plan("answer", "question", None, ["c"])[0].model == Settings.llm.metadata.model_name
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from evaluation import evaluation_plan
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationHistory, EvaluationScheduler
+from fakes import FakeJudgeBackend, make_response
+
+QUESTIONS = [f"Question {i}?" for i in range(10)]
+ANSWERS = [f"Answer {i}" for i in range(10)]
+RESPONSES = [make_response(f"Response {i}", [f"context {i}"]) for i in range(10)]
+
+
+def make_evaluators() -> dict[str, CorrectnessEvaluator]:
+    return {
+        'correctness': CorrectnessEvaluator(backend=FakeJudgeBackend()),
+        'correctness_terse': CorrectnessEvaluator(terse=True, backend=FakeJudgeBackend()),
+    }
+
+
+def test_tight_budget_is_spread_across_categories_and_questions(monkeypatch):
+    monkeypatch.setattr(evaluation_plan, "tiktoken", None)
+    evaluation_plan._encoding.cache_clear()
+    evaluators = make_evaluators()
+    scheduler = EvaluationScheduler(EvaluationBudget(), concurrency=3)
+    total_tokens = sum(item.tokens for item in scheduler.prioritize(evaluators, QUESTIONS, ANSWERS, RESPONSES))
+    budget = EvaluationBudget(max_tokens=total_tokens // 2, reserve_fraction=0.0)
+
+    outcome = asyncio.run(scheduler.run(evaluators, QUESTIONS, ANSWERS, RESPONSES, budget=budget))
+
+    evaluated = {category: len(indices) for category, indices in outcome.evaluated.items()}
+    assert all(count >= 3 for count in evaluated.values()), evaluated
+    assert outcome.tokens_used <= budget.max_tokens
+    for indices in outcome.evaluated.values():
+        # Not simply the first questions in golden-dataset order
+        assert indices != list(range(len(indices)))
+    for category in evaluators:
+        assert sorted(outcome.evaluated[category] + outcome.skipped[category]) == list(range(10))
+
+
+def test_prioritize_interleaves_categories():
+    queue = EvaluationScheduler(EvaluationBudget()).prioritize(make_evaluators(), QUESTIONS, ANSWERS, RESPONSES)
+    assert [item.category for item in queue[:4]] == ['correctness', 'correctness_terse'] * 2
+
+
+def test_history_puts_failing_and_unseen_items_first():
+    history = EvaluationHistory()
+    history.add('correctness', [EvaluationResult(QUESTIONS[i], None, "r", passing=i != 7, feedback="") for i in range(10) if i != 3])
+    queue = EvaluationScheduler(EvaluationBudget(), history=history).prioritize(
+        {'correctness': make_evaluators()['correctness']}, QUESTIONS, ANSWERS, RESPONSES)
+    assert {queue[0].index, queue[1].index} == {3, 7}
+
+
+def test_unlimited_budget_evaluates_everything():
+    outcome = asyncio.run(EvaluationScheduler(EvaluationBudget()).run(make_evaluators(), QUESTIONS, ANSWERS, RESPONSES))
+    assert all(indices == list(range(10)) for indices in outcome.evaluated.values())
+    assert all(result.passing for results in outcome.results.values() for result in results)
+
+
+def test_models_without_a_profile_run_unless_cost_is_limited():
+    evaluators = {'correctness': CorrectnessEvaluator(model='qwen2.5-72b', backend=FakeJudgeBackend())}
+    scheduler = EvaluationScheduler(EvaluationBudget(max_tokens=10**9, deadline_s=3600))
+
+    outcome = asyncio.run(scheduler.run(evaluators, QUESTIONS, ANSWERS, RESPONSES))
+
+    assert outcome.evaluated['correctness'] == list(range(10))
+    assert outcome.cost_used == 0.0
+    with pytest.raises(ValueError, match="No model profile"):
+        asyncio.run(scheduler.run(evaluators, QUESTIONS, ANSWERS, RESPONSES, budget=EvaluationBudget(max_cost=1.0)))
@@ -0,0 +1,73 @@
+import http.client
+import json
+import os
+import pickle
+import threading
+
+import pytest
+
+from evaluation import evaluation_service
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation_service import EvaluationServer, EvaluationService
+from fakes import FakeJudgeBackend, FakeReportLLM, make_response
+
+QUESTIONS = ["Q1?", "Q2?"]
+ANSWERS = ["A1", "A2"]
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(evaluation_service, "OpenAI", FakeReportLLM)
+    monkeypatch.setattr(evaluation_service, "load_golden_dataset", lambda: (QUESTIONS, ANSWERS))
+    os.makedirs(tmp_path / "responses")
+    with open(tmp_path / "responses" / "v3.pkl", 'wb') as f:
+        pickle.dump([make_response("R1", ["c1"]), make_response("R2", ["c2"])], f)
+    service = EvaluationService({'correctness': CorrectnessEvaluator(backend=FakeJudgeBackend())},
+                                results_store_path=str(tmp_path / "results.db"), responses_dir=str(tmp_path / "responses"))
+    service.start()
+    server = EvaluationServer(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server: EvaluationServer, path: str, body: str, content_type: str | None) -> tuple[int, dict]:
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1])
+    headers = {'Content-Type': content_type} if content_type else {}
+    connection.request('POST', path, body=body.encode(), headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_ndjson_submission_is_evaluated_into_its_own_directory(server, tmp_path):
+    body = "\n".join(json.dumps({'question': q, 'response': "R", 'contexts': ["c"]}) for q in QUESTIONS)
+
+    status, submission = post(server, "/evaluations?version=3&wait=1", body, "application/x-ndjson; charset=utf-8")
+
+    assert status == 200 and submission['status'] == "done"
+    assert submission['report']['detailed_metrics']['correctness']['passing_rate'] == 1.0
+    assert os.path.isdir(tmp_path / f"evaluation_v3_{submission['id']}")
+
+
+def test_body_without_a_json_content_type_is_rejected(server):
+    status, body = post(server, "/evaluations", json.dumps({'version': 3, 'responses_file': "v3.pkl"}), "text/plain")
+    assert status == 415
+    assert not server.service.submissions
+
+
+def test_responses_file_is_resolved_inside_the_responses_dir(server):
+    status, submission = post(server, "/evaluations?wait=1", json.dumps({'version': 3, 'responses_file': "v3.pkl"}),
+                              "application/json")
+    assert status == 200 and submission['items'] == 2
+
+    status, body = post(server, "/evaluations", json.dumps({'version': 3, 'responses_file': "../results.db"}),
+                        "application/json")
+    assert status == 400 and "must be inside" in body['error']
+
+
+def test_responses_file_is_disabled_without_a_responses_dir(server):
+    server.service.responses_dir = None
+    status, body = post(server, "/evaluations", json.dumps({'version': 3, 'responses_file': "v3.pkl"}), "application/json")
+    assert status == 400 and "disabled" in body['error']
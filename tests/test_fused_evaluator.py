@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+from evaluation.fused_evaluator import FusedEvaluator
+from evaluation.judge_backend import JudgeCompletion
+from fakes import FakeJudgeBackend, make_response, usage
+
+CATEGORIES = ['correctness', 'faithfulness']
+
+
+def fused_reply(messages, max_tokens, response_format):
+    verdicts = [{'criterion': category, 'passing': True, 'feedback': 'ok'} for category in CATEGORIES]
+    return JudgeCompletion(content=json.dumps({'verdicts': verdicts}), usage=usage())
+
+
+def test_one_call_serves_every_fused_category():
+    backend = FakeJudgeBackend(fused_reply)
+    fused = FusedEvaluator(CATEGORIES, backend=backend)
+
+    async def run():
+        return await asyncio.gather(*(fused.category(c)._evaluate("r", "q", "a", ["c"]) for c in CATEGORIES))
+
+    assert all(result.passing for result in asyncio.run(run()))
+    assert len(backend.calls) == 1
+
+
+def test_verdicts_are_keyed_on_answer_and_contexts():
+    backend = FakeJudgeBackend(fused_reply)
+    fused = FusedEvaluator(CATEGORIES, backend=backend)
+
+    async def run():
+        await fused.judge("same text", "q", "a", ["context one"])
+        await fused.judge("same text", "q", "a", ["context two"])
+        await fused.judge("same text", "q", "other answer", ["context one"])
+        await fused.judge("same text", "q", "a", ["context one"])
+
+    asyncio.run(run())
+    assert len(backend.calls) == 3
+
+
+def test_failed_calls_are_not_remembered():
+    failures = [RuntimeError("transient")]
+
+    def reply(messages, max_tokens, response_format):
+        if failures:
+            raise failures.pop()
+        return fused_reply(messages, max_tokens, response_format)
+    backend = FakeJudgeBackend(reply)
+    evaluator = FusedEvaluator(CATEGORIES, backend=backend).category('correctness')
+
+    async def run():
+        first = await evaluator.evaluate_response("q", "a", make_response("r", ["c"]))
+        second = await evaluator.evaluate_response("q", "a", make_response("r", ["c"]))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.response_text == "ERROR"
+    assert second.passing
+    assert len(backend.calls) == 2
+
+
+def test_start_run_clears_the_memo():
+    backend = FakeJudgeBackend(fused_reply)
+    fused = FusedEvaluator(CATEGORIES, backend=backend)
+    evaluator = fused.category('correctness')
+
+    async def run():
+        evaluator.start_run()
+        await fused.judge("r", "q", "a", [])
+        evaluator.start_run()
+        await fused.judge("r", "q", "a", [])
+
+    asyncio.run(run())
+    assert len(backend.calls) == 2
+
+
+def test_a_new_run_keeps_the_memo_of_runs_in_flight():
+    backend = FakeJudgeBackend(fused_reply)
+    fused = FusedEvaluator(CATEGORIES, backend=backend)
+    first_judged, second_started = asyncio.Event(), asyncio.Event()
+
+    async def first_run():
+        fused.start_run()
+        await fused.judge("r", "q", "a", [])
+        first_judged.set()
+        await second_started.wait()
+        # The next fused category of the same item
+        await fused.judge("r", "q", "a", [])
+
+    async def second_run():
+        await first_judged.wait()
+        fused.start_run()
+        second_started.set()
+
+    async def run():
+        await asyncio.gather(first_run(), second_run())
+
+    asyncio.run(run())
+    assert len(backend.calls) == 1
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from evaluation.guideline_compliance_evaluator import GuidelineComplianceEvaluator
+from fakes import FakeJudgeBackend, make_response
+
+QUESTIONS = ["Fast?", "Slow?"]
+
+
+class SlowQuestionBackend(FakeJudgeBackend):
+    """Takes longer on the slow question and logs when each call finishes."""
+    def __init__(self, events: list[str]) -> None:
+        super().__init__()
+        self.events: list[str] = events
+
+    async def complete(self, model, messages, temperature=0.0, max_tokens=None, response_format=None):
+        slow = "Slow?" in messages[-1]['content']
+        await asyncio.sleep(0.05 if slow else 0.0)
+        completion = await super().complete(model, messages, temperature, max_tokens, response_format)
+        self.events.append("call")
+        return completion
+
+
+@pytest.mark.parametrize('group_by_guideline', [False, True])
+def test_results_arrive_per_item_unless_grouped_by_guideline(group_by_guideline):
+    events: list[str] = []
+    evaluator = GuidelineComplianceEvaluator(backend=SlowQuestionBackend(events), group_by_guideline=group_by_guideline)
+
+    results = asyncio.run(evaluator.evaluate_responses(
+        QUESTIONS, ["A", "A"], [make_response("R1"), make_response("R2")],
+        on_result=lambda result: events.append(result.query)))
+
+    assert [result.passing for result in results] == [True, True]
+    # Grouping waits for every guideline pass before any item is done
+    fast_done_early = events.index("Fast?") < len(events) - 1 - events[::-1].index("call")
+    assert fast_done_early is not group_by_guideline
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from evaluation.judge_backend import MicroBatchingBackend
+from evaluation.local_judge_server import VERDICT_TEXT, StandInJudgeServer
+
+
+@pytest.fixture
+def server():
+    server = StandInJudgeServer(port=0, request_delay_s=0.02)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _backend(server: StandInJudgeServer, **kwargs) -> MicroBatchingBackend:
+    return MicroBatchingBackend(f"http://127.0.0.1:{server.server_address[1]}/v1", batch_window_s=0.05, **kwargs)
+
+
+def _prompts(n: int) -> list[list[dict[str, str]]]:
+    return [[{'role': 'user', 'content': f"prompt {i}"}] for i in range(n)]
+
+
+def chat_template(messages: list[dict[str, str]]) -> str:
+    return "".join(f"<|im_start|>{m['role']}\n{m['content']}<|im_end|>\n" for m in messages) + "<|im_start|>assistant\n"
+
+
+def test_completions_mode_needs_the_model_chat_template(server):
+    with pytest.raises(ValueError, match="prompt_formatter"):
+        _backend(server, use_completions=True)
+
+
+def test_completions_mode_sends_micro_batches(server):
+    backend = _backend(server, max_batch_size=4, use_completions=True, prompt_formatter=chat_template)
+
+    async def run():
+        return await asyncio.gather(*(backend.complete("judge", messages) for messages in _prompts(10)))
+
+    completions = asyncio.run(run())
+
+    assert [c.content for c in completions] == [VERDICT_TEXT] * 10
+    assert sorted(server.batch_sizes) == [2, 4, 4]
+    assert backend.stats.prompts == 10 and backend.stats.max_batch_size == 4
+
+
+def test_chat_mode_releases_each_prompt_as_its_own_request(server):
+    backend = _backend(server)
+
+    async def run():
+        return await asyncio.gather(*(backend.complete("judge", messages) for messages in _prompts(5)))
+
+    completions = asyncio.run(run())
+
+    assert [c.content for c in completions] == [VERDICT_TEXT] * 5
+    assert server.batch_sizes == [1] * 5
+    assert backend.stats.batch_sizes == {5: 1}
+
+
+def test_chat_mode_fails_only_the_failing_prompt(server):
+    backend = _backend(server)
+    create = backend.llm.chat.completions.create
+
+    async def flaky_create(**kwargs):
+        if kwargs['messages'][0]['content'] == "prompt 2":
+            raise RuntimeError("server rejected prompt")
+        return await create(**kwargs)
+
+    backend.llm.chat.completions.create = flaky_create
+
+    async def run():
+        return await asyncio.gather(*(backend.complete("judge", messages) for messages in _prompts(4)),
+                                    return_exceptions=True)
+
+    completions = asyncio.run(run())
+
+    assert isinstance(completions[2], RuntimeError)
+    assert [c.content for i, c in enumerate(completions) if i != 2] == [VERDICT_TEXT] * 3
@@ -0,0 +1,40 @@
+import asyncio
+import pickle
+
+from evaluation import matrix_evaluation
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.matrix_evaluation import MatrixEvaluationRunner, ResponseSet
+from evaluation.results_store import ResultsStore
+from fakes import FakeJudgeBackend, FakeReportLLM, make_response
+
+QUESTIONS = ["Q1?", "Q2?", "Q3?"]
+ANSWERS = ["A1", "A2", "A3"]
+
+
+def save_responses(path, texts: list[str]) -> str:
+    with open(path, 'wb') as f:
+        pickle.dump([make_response(text, ["context"]) for text in texts], f)
+    return str(path)
+
+
+def test_shared_verdicts_are_judged_once_and_usage_is_reported_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(matrix_evaluation, "OpenAI", FakeReportLLM)
+    monkeypatch.setattr(matrix_evaluation, "load_golden_dataset", lambda: (QUESTIONS, ANSWERS))
+    backend = FakeJudgeBackend()
+    store = ResultsStore(str(tmp_path / "results.db"))
+    runner = MatrixEvaluationRunner([
+        ResponseSet(version=1, responses_file=save_responses(tmp_path / "v1.pkl", ["R1", "R2", "R3"])),
+        # Only the second answer differs from version 1
+        ResponseSet(version=2, responses_file=save_responses(tmp_path / "v2.pkl", ["R1", "other", "R3"])),
+    ], evaluators={'correctness': CorrectnessEvaluator(backend=backend)}, results_store=store)
+
+    reports = asyncio.run(runner.run(limit=3))
+
+    assert len(backend.calls) == 4
+    assert all(report['usage'] == {} for report in reports.values())
+    with open(tmp_path / "evaluation_matrix_v1_v2.txt") as f:
+        comparison = f.read()
+    assert "CORRECTNESS: 4 calls" in comparison
+    # Every version's run holds all of its verdicts, shared or not
+    assert store.pass_rates() == [(1, 'correctness', 1.0, 3), (2, 'correctness', 1.0, 3)]
@@ -0,0 +1,71 @@
+import asyncio
+import os
+import pickle
+
+from evaluation import evaluation
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import ResponseEvaluationPipeline
+from evaluation.evaluation_result import EvaluationResult
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationHistory, EvaluationScheduler
+from evaluation.judge_backend import JudgeCompletion
+from evaluation.results_store import ResultsStore
+from fakes import PASS_TEXT, FakeJudgeBackend, FakeReportLLM, make_response, usage
+
+
+def verdicts(passing: dict[str, bool]) -> list[EvaluationResult]:
+    return [EvaluationResult(question, None, "r", passing=ok, feedback="") for question, ok in passing.items()]
+
+
+def test_runs_without_verdicts_do_not_hide_earlier_ones(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    store.add_results(store.start_run(1), 1, 'correctness', verdicts({"Q1?": True, "Q2?": True}))
+    store.add_results(store.start_run(1), 1, 'faithfulness', verdicts({"Q1?": True}))
+    new_run = store.start_run(2)
+    store.add_results(new_run, 2, 'correctness', verdicts({"Q1?": False, "Q2?": True}))
+    store.add_results(new_run, 2, 'faithfulness', verdicts({"Q1?": False}))
+    # A later run of version 2 that crashed before recording anything
+    store.start_run(2)
+
+    assert store.latest_run(2) == new_run
+    assert store.regressions(1, 2) == [('correctness', "Q1?"), ('faithfulness', "Q1?")]
+    assert store.regressions(1, 2, category='faithfulness') == [('faithfulness', "Q1?")]
+    assert store.pass_rates(category='faithfulness') == [(1, 'faithfulness', 1.0, 1), (2, 'faithfulness', 0.0, 1)]
+    # Each category's rate comes from the latest run of version 1 that judged it
+    assert store.pass_rates() == [(1, 'correctness', 1.0, 2), (1, 'faithfulness', 1.0, 1),
+                                  (2, 'correctness', 0.5, 2), (2, 'faithfulness', 0.0, 1)]
+
+
+def test_empty_store_is_backfilled_from_legacy_pickles(tmp_path):
+    os.makedirs(tmp_path / "evaluation_v3")
+    with open(tmp_path / "evaluation_v3" / "correctness_eval_results.pkl", 'wb') as f:
+        pickle.dump(verdicts({"Q1?": False, "Q2?": True}), f)
+    store = ResultsStore(str(tmp_path / "results.db"))
+
+    history = EvaluationHistory.from_store(store, legacy_root=str(tmp_path))
+    assert history.coverage('correctness', "Q1?") == 1
+    assert history.failure_rate('correctness', "Q1?") == 1.0
+
+    # Only an empty store is backfilled
+    EvaluationHistory.from_store(store, legacy_root=str(tmp_path))
+    assert store.connection.execute('SELECT COUNT(*) FROM runs').fetchone()[0] == 1
+
+
+def test_verdicts_are_stored_as_they_arrive(tmp_path, monkeypatch):
+    monkeypatch.setattr(evaluation, "RESULTS_STORE_BATCH_SIZE", 2)
+    store = ResultsStore(str(tmp_path / "results.db"))
+    stored_before_call: list[int] = []
+
+    def reply(messages, max_tokens, response_format):
+        stored_before_call.append(store.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0])
+        return JudgeCompletion(content=PASS_TEXT, usage=usage())
+
+    pipeline = ResponseEvaluationPipeline(llm=FakeReportLLM(), version=1, description="", model="gpt-4o",
+                                          evaluators={'correctness': CorrectnessEvaluator(backend=FakeJudgeBackend(reply))},
+                                          output_dir=str(tmp_path), results_store=store)
+    questions = [f"Q{i}?" for i in range(5)]
+    responses = [make_response(f"R{i}") for i in range(5)]
+    asyncio.run(pipeline.evaluate_responses_scheduled(responses, questions, ["A"] * 5,
+                                                      EvaluationScheduler(EvaluationBudget(), concurrency=1)))
+
+    assert stored_before_call == [0, 0, 2, 2, 4]
+    assert store.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] == 5
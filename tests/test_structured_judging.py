@@ -0,0 +1,40 @@
+import asyncio
+
+from evaluation.binary_evaluator import STRUCTURED_MAX_TOKENS, STRUCTURED_RETRY_MAX_TOKENS
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.judge_backend import JudgeCompletion
+from fakes import PASS_JSON, FakeJudgeBackend, usage
+
+
+def test_truncated_verdict_is_retried_with_a_larger_limit():
+    def reply(messages, max_tokens, response_format):
+        if max_tokens == STRUCTURED_MAX_TOKENS:
+            return JudgeCompletion(content='{"passing": true, "score": 5, "feedback": "a very lo', usage=usage(), truncated=True)
+        return JudgeCompletion(content=PASS_JSON, usage=usage())
+    backend = FakeJudgeBackend(reply)
+    evaluator = CorrectnessEvaluator(terse=True, backend=backend)
+
+    result = asyncio.run(evaluator._evaluate("generated", "question", "answer", []))
+
+    assert result.passing and result.response_text != "ERROR"
+    assert [call['max_tokens'] for call in backend.calls] == [STRUCTURED_MAX_TOKENS, STRUCTURED_RETRY_MAX_TOKENS]
+    assert evaluator.usage.calls == 2
+
+
+def test_terse_failure_is_explained_by_the_verbose_judge():
+    def reply(messages, max_tokens, response_format):
+        if response_format is not None:
+            return JudgeCompletion(content='{"passing": false, "score": 1, "feedback": "short"}', usage=usage())
+        return JudgeCompletion(content="<evaluation>\nResult: PASS\nFeedback: long explanation\n</evaluation>", usage=usage())
+    evaluator = CorrectnessEvaluator(terse=True, explain_failures=True, backend=FakeJudgeBackend(reply))
+
+    result = asyncio.run(evaluator._evaluate("generated", "question", "answer", []))
+
+    assert not result.passing
+    assert result.feedback == "long explanation"
+
+
+def test_verbose_verdict_is_parsed_from_text():
+    evaluator = CorrectnessEvaluator(backend=FakeJudgeBackend())
+    result = asyncio.run(evaluator._evaluate("generated", "question", "answer", []))
+    assert result.passing and result.feedback == "ok"
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+import pickle
+
+import pytest
+
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import EvaluationRunner
+from evaluation.results_store import ResultsStore
+from evaluation.tracing import tracer
+from fakes import FakeJudgeBackend, FakeReportLLM, make_response
+
+QUESTIONS = ["Q1?", "Q2?", "Q3?"]
+ANSWERS = ["A1", "A2", "A3"]
+
+
+def make_runner(tmp_path, backend: FakeJudgeBackend) -> EvaluationRunner:
+    return EvaluationRunner(
+        version=7,
+        description="",
+        model="gpt-4o",
+        evaluators={'correctness': CorrectnessEvaluator(backend=backend)},
+        use_answer_cache=False,
+        results_store=ResultsStore(str(tmp_path / "results.db")),
+        llm=FakeReportLLM(),
+        golden_dataset=(QUESTIONS, ANSWERS),
+        output_dir=str(tmp_path / "out")
+    )
+
+
+def save_responses(tmp_path) -> str:
+    path = str(tmp_path / "responses.pkl")
+    with open(path, 'wb') as f:
+        pickle.dump([make_response(f"R{i}", [f"context {i}"]) for i in range(len(QUESTIONS))], f)
+    return path
+
+
+def test_judge_calls_are_traced_with_category_and_question(tmp_path):
+    runner = make_runner(tmp_path, FakeJudgeBackend())
+
+    asyncio.run(runner.run(responses_file=save_responses(tmp_path), limit=3, trace=True))
+
+    with open(os.path.join(runner.output_dir, "trace_p7.json")) as f:
+        events = [e for e in json.load(f)['traceEvents'] if e['ph'] == 'X']
+    judge_calls = [e for e in events if e['name'] == 'judge_call']
+    assert len(judge_calls) == 3
+    assert all(e['args']['category'] == 'correctness' for e in judge_calls)
+    assert sorted(e['args']['question_index'] for e in judge_calls) == [0, 1, 2]
+    assert {'semaphore_wait', 'evaluate_item', 'parse', 'category'} <= {e['name'] for e in events}
+    assert not tracer.enabled
+
+
+def test_tracer_is_disabled_when_the_run_fails(tmp_path):
+    def reply(messages, max_tokens, response_format):
+        raise RuntimeError("judge down")
+    runner = make_runner(tmp_path, FakeJudgeBackend(reply))
+    runner.pipeline.generate_report = None  # Fails the run after evaluation
+
+    with pytest.raises(TypeError):
+        asyncio.run(runner.run(responses_file=save_responses(tmp_path), limit=3, trace=True))
+    assert not tracer.enabled
+
+
+def test_dry_run_does_not_enable_the_tracer(tmp_path):
+    runner = make_runner(tmp_path, FakeJudgeBackend())
+    asyncio.run(runner.run(responses_file=save_responses(tmp_path), limit=3, dry_run=True, trace=True))
+    assert not tracer.enabled
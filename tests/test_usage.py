@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from evaluation.correctness_evaluator import CorrectnessEvaluator
+from evaluation.evaluation import ResponseEvaluationPipeline
+from evaluation.evaluation_scheduler import EvaluationBudget, EvaluationScheduler
+from evaluation.fused_evaluator import FusedEvaluator
+from evaluation.judge_backend import JudgeCompletion
+from fakes import FakeJudgeBackend, FakeReportLLM, make_response, usage
+
+QUESTIONS = ["Q1?", "Q2?"]
+ANSWERS = ["A1", "A2"]
+RESPONSES = [make_response("R1", ["c1"]), make_response("R2", ["c2"])]
+
+
+def make_pipeline(tmp_path, evaluators) -> ResponseEvaluationPipeline:
+    return ResponseEvaluationPipeline(llm=FakeReportLLM(), version=1, description="", model="gpt-4o",
+                                      evaluators=evaluators, output_dir=str(tmp_path))
+
+
+def test_fused_usage_survives_any_category_order(tmp_path):
+    def reply(messages, max_tokens, response_format):
+        verdicts = [{'criterion': c, 'passing': True, 'feedback': 'ok'} for c in ['correctness', 'faithfulness']]
+        return JudgeCompletion(content=json.dumps({'verdicts': verdicts}), usage=usage(prompt_tokens=50))
+    fused = FusedEvaluator(['correctness', 'faithfulness'], backend=FakeJudgeBackend(reply))
+    # The category the usage is reported under runs last
+    pipeline = make_pipeline(tmp_path, {'faithfulness': fused.category('faithfulness'), 'correctness': fused.category('correctness')})
+
+    results = asyncio.run(pipeline.evaluate_responses(RESPONSES, QUESTIONS, ANSWERS))
+    report = pipeline.generate_report(results, responses_processed=2)
+
+    assert report['usage']['correctness'].calls == 2
+    assert report['usage']['correctness'].prompt_tokens == 100
+
+
+def test_reports_show_one_run_of_usage(tmp_path):
+    evaluator = CorrectnessEvaluator(backend=FakeJudgeBackend())
+    pipeline = make_pipeline(tmp_path, {'correctness': evaluator})
+    scheduler = EvaluationScheduler(EvaluationBudget())
+
+    async def run_twice():
+        reports = []
+        for _ in range(2):
+            outcome = await pipeline.evaluate_responses_scheduled(RESPONSES, QUESTIONS, ANSWERS, scheduler)
+            reports.append(pipeline.generate_report(outcome.results, responses_processed=2))
+        return reports
+
+    first, second = asyncio.run(run_twice())
+    assert first['usage']['correctness'].calls == 2
+    assert second['usage']['correctness'].calls == 2
+    assert first['usage']['correctness'] is not second['usage']['correctness']
+    # The evaluator's own stats are lifetime totals
+    assert evaluator.usage.calls == 4
@@ -0,0 +1,84 @@
+"""Opt-in span tracing exported as Chrome trace / Perfetto JSON.
+
+Spans are recorded per asyncio task, so every concurrently running task gets
+its own row in the timeline. Tags set with `trace_tags` (category, question
+index, ...) are attached to every span opened beneath them, including spans
+in tasks created inside the block.
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+import json
+import os
+import threading
+import time
+from typing import Any, Iterator
+
+_tags: ContextVar[dict[str, Any]] = ContextVar('trace_tags', default={})
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self.events: list[dict[str, Any]] = []
+        self._lanes: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._start: float = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.events = []
+        self._lanes = {}
+        self._start = time.perf_counter()
+
+    def disable(self):
+        self.enabled = False
+
+    def _lane(self) -> int:
+        try:
+            owner = id(asyncio.current_task())
+        except RuntimeError:
+            owner = threading.get_ident()
+        with self._lock:
+            return self._lanes.setdefault(owner, len(self._lanes) + 1)
+
+    @contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        lane = self._lane()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.events.append({
+                    'name': name,
+                    'ph': 'X',
+                    'ts': (start - self._start) * 1_000_000,
+                    'dur': (end - start) * 1_000_000,
+                    'pid': os.getpid(),
+                    'tid': lane,
+                    'args': {**_tags.get(), **args}
+                })
+
+    def export(self, path: str):
+        """Write the recorded spans as a Chrome trace that Perfetto can open."""
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': lane, 'args': {'name': f'task {lane}'}}
+                    for lane in self._lanes.values()]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+@contextmanager
+def trace_tags(**tags: Any) -> Iterator[None]:
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+tracer = Tracer()